@@ -0,0 +1,4 @@
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_MANIFEST = RESULTS_DIR / "seed.json"
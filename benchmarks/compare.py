@@ -0,0 +1,81 @@
+"""
+Compare two benchmarks/run.py result files.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.1
+
+Flags endpoints whose throughput dropped or p95/p99 latency grew by more
+than the threshold, or which issue more SQL statements per request. Exits
+with status 1 when anything regressed so it can gate CI.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+
+def change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before
+
+
+def fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:+.1%}"
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> List[str]:
+    regressions = []
+    print(f"{'endpoint':<12} {'throughput':>11} {'p95':>9} {'p99':>9} {'sql/req':>15}")
+    for name, after in candidate["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            print(f"{name:<12} new endpoint")
+            continue
+
+        throughput = change(before["throughput_rps"], after["throughput_rps"])
+        p95 = change(before["latency_ms"]["p95"], after["latency_ms"]["p95"])
+        p99 = change(before["latency_ms"]["p99"], after["latency_ms"]["p99"])
+        sql_before = before["sql_statements"]["mean"]
+        sql_after = after["sql_statements"]["mean"]
+        print(
+            f"{name:<12} {fmt(throughput):>11} {fmt(p95):>9} {fmt(p99):>9} "
+            f"{sql_before!s:>6} -> {sql_after!s:<6}"
+        )
+
+        if throughput is not None and throughput < -threshold:
+            regressions.append(f"{name}: throughput {fmt(throughput)}")
+        for label, value in (("p95", p95), ("p99", p99)):
+            if value is not None and value > threshold:
+                regressions.append(f"{name}: {label} latency {fmt(value)}")
+        # counts only vary with cache hits, so even small increases are real changes
+        if sql_before is not None and sql_after is not None and sql_after - sql_before > max(0.5, sql_before * threshold):
+            regressions.append(f"{name}: {sql_before} -> {sql_after} SQL statements per request")
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{name}: {before['errors']} -> {after['errors']} errors")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change tolerated, 0.1 is 10%%")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    for label, results in (("baseline", baseline), ("candidate", candidate)):
+        meta = results["meta"]
+        print(f"{label}: {meta.get('label') or meta['commit']} at {meta['started_at']}, concurrency {meta['concurrency']}")
+
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print("\nregressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
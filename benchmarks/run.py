@@ -0,0 +1,275 @@
+"""
+Drive the API at a fixed concurrency and record latency per endpoint.
+
+    python -m benchmarks.run --base-url http://localhost:8000 --concurrency 20 --requests 1000
+
+Run against a server started on a catalog from benchmarks/seed.py, with
+RATE_LIMIT_ENABLED=false: all workers log in from one address, and the login
+scenario alone is far over the auth limits. A rate limited response stops the
+run instead of being counted as an error. Each scenario runs on its own so
+results don't mix. SQL statement counts come
+from the Server-Timing header the API adds to every response. Results are
+written as JSON, compare two runs with benchmarks/compare.py.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks import DEFAULT_MANIFEST, RESULTS_DIR
+
+API = "/api/v1"
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries')
+
+Request = Callable[[httpx.AsyncClient, "Worker"], Awaitable[httpx.Response]]
+
+
+class RateLimited(Exception):
+    """The server enforces rate limits, which would skew every latency"""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(
+            f"{path} answered 429: restart the server with RATE_LIMIT_ENABLED=false "
+            "to benchmark it"
+        )
+
+
+def check_rate_limited(response: httpx.Response) -> None:
+    if response.status_code == 429:
+        raise RateLimited(response.request.url.path)
+
+
+class Worker:
+    """State of one simulated client: its token and a random source"""
+
+    def __init__(self, token: str, rng: random.Random, manifest: dict) -> None:
+        self.token = token
+        self.rng = rng
+        self.manifest = manifest
+        self.cursor: Optional[str] = None
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def book(self) -> str:
+        return self.rng.choice(self.manifest["books"])
+
+
+async def login(client: httpx.AsyncClient, worker: Worker) -> httpx.Response:
+    return await client.post(
+        f"{API}/auth/login",
+        json={"email": worker.rng.choice(worker.manifest["users"]), "password": worker.manifest["password"]},
+    )
+
+
+async def list_books(client: httpx.AsyncClient, worker: Worker) -> httpx.Response:
+    # walk a few pages deep, then start over
+    params = {"limit": 20}
+    if worker.cursor:
+        params["cursor"] = worker.cursor
+    response = await client.get(f"{API}/books/", params=params, headers=worker.headers)
+    if response.status_code == 200:
+        next_cursor = response.json().get("next_cursor")
+        worker.cursor = next_cursor if next_cursor and worker.rng.random() < 0.8 else None
+    return response
+
+
+async def book_detail(client: httpx.AsyncClient, worker: Worker) -> httpx.Response:
+    return await client.get(f"{API}/books/{worker.book()}", headers=worker.headers)
+
+
+async def add_review(client: httpx.AsyncClient, worker: Worker) -> httpx.Response:
+    return await client.post(
+        f"{API}/reviews/book/{worker.book()}",
+        json={"rating": worker.rng.randint(1, 5), "review_text": "Benchmark review"},
+        headers=worker.headers,
+    )
+
+
+async def tag_book(client: httpx.AsyncClient, worker: Worker) -> httpx.Response:
+    names = worker.rng.sample(worker.manifest["tags"], min(3, len(worker.manifest["tags"])))
+    return await client.post(
+        f"{API}/tags/book/{worker.book()}/tags",
+        json={"tags": [{"name": name} for name in names]},
+        headers=worker.headers,
+    )
+
+
+async def search(client: httpx.AsyncClient, worker: Worker) -> httpx.Response:
+    terms = worker.rng.sample(worker.manifest["search_terms"], worker.rng.randint(1, 2))
+    if worker.rng.random() < 0.25:
+        # drop a letter, fuzzy matching has to find it
+        word = terms[0]
+        cut = worker.rng.randrange(len(word))
+        terms[0] = word[:cut] + word[cut + 1:]
+    return await client.get(f"{API}/books/search", params={"q": " ".join(terms)}, headers=worker.headers)
+
+
+SCENARIOS: Dict[str, Request] = {
+    "login": login,
+    "list_books": list_books,
+    "book_detail": book_detail,
+    "add_review": add_review,
+    "tag_book": tag_book,
+    "search": search,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], statements: List[int], elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "sql_statements": {
+            "mean": round(statistics.fmean(statements), 2) if statements else None,
+            "max": max(statements) if statements else None,
+        },
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, request: Request, workers: List[Worker], total: int, warmup: int) -> dict:
+    for i in range(warmup):
+        check_rate_limited(await request(client, workers[i % len(workers)]))
+
+    remaining = total
+    latencies: List[float] = []
+    statements: List[int] = []
+    statuses: Dict[str, int] = {}
+
+    async def drive(worker: Worker) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await request(client, worker)
+                check_rate_limited(response)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+                response = None
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if response is not None:
+                match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+                if match:
+                    statements.append(int(match.group(1)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(worker) for worker in workers))
+    return summarize(latencies, statuses, statements, time.perf_counter() - start)
+
+
+async def login_workers(client: httpx.AsyncClient, manifest: dict, count: int, seed: int) -> List[Worker]:
+    workers = []
+    for i in range(count):
+        email = manifest["users"][i % len(manifest["users"])]
+        response = await client.post(f"{API}/auth/login", json={"email": email, "password": manifest["password"]})
+        check_rate_limited(response)
+        response.raise_for_status()
+        workers.append(Worker(response.json()["access_token"], random.Random(seed + i), manifest))
+    return workers
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    manifest = json.loads(args.manifest.read_text())
+    started_at = datetime.now(timezone.utc)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        workers = await login_workers(client, manifest, args.concurrency, args.seed)
+        endpoints = {}
+        for name in args.scenarios:
+            endpoints[name] = await run_scenario(client, SCENARIOS[name], workers, args.requests, args.warmup)
+            print_row(name, endpoints[name])
+
+    return {
+        "meta": {
+            "started_at": started_at.isoformat(),
+            "commit": git_commit(),
+            "label": args.label,
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "python": platform.python_version(),
+            "catalog": manifest["counts"],
+        },
+        "endpoints": endpoints,
+    }
+
+
+def print_row(name: str, result: dict) -> None:
+    latency = result["latency_ms"]
+    sql = result["sql_statements"]["mean"]
+    print(
+        f"{name:<12} {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {latency['p50']:>8.2f}  p95 {latency['p95']:>8.2f}  p99 {latency['p99']:>8.2f} ms  "
+        f"sql {sql if sql is not None else '-':>5}  errors {result['errors']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests before each scenario")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--label", help="free text stored with the results, e.g. the release")
+    parser.add_argument("--output", type=Path, help="defaults to benchmarks/results/<time>-<commit>.json")
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run(args))
+    except RateLimited as e:
+        raise SystemExit(str(e))
+    output = args.output or RESULTS_DIR / (
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['meta']['commit'] or 'nogit'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Seed Postgres with a synthetic catalog for benchmarks/run.py.
+
+    python -m benchmarks.seed --users 200 --books 5000 --reviews-per-book 5 --tags 50 --reset
+
+Uses DATABASE_URL and REDIS_URL like the app. --reset empties the bookly
+tables first, never point it at a database you care about. Writes a
+manifest of the seeded users, books and tags that run.py picks from.
+"""
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert, text
+
+from benchmarks import DEFAULT_MANIFEST
+from src.auth.utils import hash_password
+from src.db.cache import CACHE_PREFIX
+from src.db.main import async_engine
+from src.db.models import Book, BookTag, Review, Tag, User
+from src.db.redis import redis_client
+
+CHUNK_SIZE = 1000
+BENCH_PASSWORD = "benchmark-password"
+LANGUAGES = ["en", "fr", "de", "es", "it"]
+WORDS = (
+    "river night garden winter empire shadow glass ocean silent paper "
+    "crown forest letter machine golden last little secret city house"
+).split()
+
+
+def chunks(rows: list, size: int = CHUNK_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).title()
+
+
+def rating_aggregates(histogram: list) -> dict:
+    """Book aggregates of reviews rated 1-5 counted in histogram"""
+    review_count = sum(histogram)
+    rating_sum = sum(rating * count for rating, count in enumerate(histogram, start=1))
+    return {
+        "review_count": review_count,
+        "rating_sum": rating_sum,
+        **{f"rating_{rating}": count for rating, count in enumerate(histogram, start=1)},
+        "average_rating": rating_sum / review_count if review_count else 0,
+    }
+
+
+async def insert_rows(conn, model, rows: list) -> None:
+    for chunk in chunks(rows):
+        await conn.execute(insert(model), chunk)
+
+
+async def seed(args) -> dict:
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    password_hash = await hash_password(BENCH_PASSWORD)
+
+    users = [
+        {
+            "uid": uuid.uuid4(),
+            "username": f"reader{i}",
+            "first_name": "Bench",
+            "last_name": f"Reader {i}",
+            "role": "user",
+            "is_verified": True,
+            "email": f"reader{i}@bench.bookly.test",
+            "password_hash": password_hash,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(args.users)
+    ]
+    tags = [
+        {"uid": uuid.uuid4(), "name": f"tag-{i}", "created_at": now}
+        for i in range(args.tags)
+    ]
+    books = []
+    for i in range(args.books):
+        created_at = now - timedelta(minutes=args.books - i)
+        books.append({
+            "uid": uuid.uuid4(),
+            "title": title(rng),
+            "author": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+            "publisher": f"{rng.choice(WORDS).title()} Press",
+            "published_date": date(1950, 1, 1) + timedelta(days=rng.randrange(27000)),
+            "page_count": rng.randint(80, 900),
+            "language": rng.choice(LANGUAGES),
+            "user_uid": rng.choice(users)["uid"],
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+    reviews = [
+        {
+            "uid": uuid.uuid4(),
+            "rating": rng.randint(1, 5),
+            "review_text": " ".join(rng.choice(WORDS) for _ in range(12)),
+            "user_uid": rng.choice(users)["uid"],
+            "book_uid": book["uid"],
+            "created_at": book["created_at"],
+            "update_at": book["created_at"],
+        }
+        for book in books
+        for _ in range(rng.randint(0, 2 * args.reviews_per_book))
+    ]
+    # core inserts skip the increments the API applies per review, so the
+    # books get their aggregates up front
+    histograms = {book["uid"]: [0] * 5 for book in books}
+    for review in reviews:
+        histograms[review["book_uid"]][review["rating"] - 1] += 1
+    for book in books:
+        book.update(rating_aggregates(histograms[book["uid"]]))
+    book_tags = [
+        {"book_id": book["uid"], "tag_id": tag["uid"]}
+        for book in books
+        for tag in rng.sample(tags, min(len(tags), rng.randint(0, 3)))
+    ]
+
+    async with async_engine.begin() as conn:
+        if args.reset:
+            await conn.execute(text("TRUNCATE booktag, reviews, tags, books, users"))
+        await insert_rows(conn, User, users)
+        await insert_rows(conn, Tag, tags)
+        await insert_rows(conn, Book, books)
+        await insert_rows(conn, Review, reviews)
+        await insert_rows(conn, BookTag, book_tags)
+        await conn.execute(text("ANALYZE"))
+
+    # cached responses would describe the catalog from before the seed
+    keys = [key async for key in redis_client.scan_iter(f"{CACHE_PREFIX}*")]
+    if keys:
+        await redis_client.delete(*keys)
+    await redis_client.aclose()
+    await async_engine.dispose()
+
+    return {
+        "seed": args.seed,
+        "password": BENCH_PASSWORD,
+        "counts": {
+            "users": len(users),
+            "books": len(books),
+            "reviews": len(reviews),
+            "tags": len(tags),
+            "book_tags": len(book_tags),
+        },
+        "users": [user["email"] for user in users],
+        "books": [str(book["uid"]) for book in rng.sample(books, min(len(books), 2000))],
+        "tags": [tag["name"] for tag in tags],
+        "search_terms": WORDS,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--reviews-per-book", type=int, default=5, help="average, actual counts vary per book")
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42, help="random seed, same seed gives the same catalog shape")
+    parser.add_argument("--reset", action="store_true", help="truncate the bookly tables before seeding")
+    parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    args = parser.parse_args()
+
+    manifest = asyncio.run(seed(args))
+    args.manifest.parent.mkdir(parents=True, exist_ok=True)
+    args.manifest.write_text(json.dumps(manifest, indent=2))
+    print(f"seeded {manifest['counts']}, manifest written to {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
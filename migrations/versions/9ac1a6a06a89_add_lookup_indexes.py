@@ -0,0 +1,86 @@
+"""add lookup indexes and unique constraints
+
+Revision ID: 9ac1a6a06a89
+Revises: 377e2ee93071
+Create Date: 2026-10-18 10:12:41.503118
+
+Indexes are built with CREATE INDEX CONCURRENTLY outside of the migration
+transaction so the tables stay writable. If a concurrent build fails it
+leaves an INVALID index behind; drop it and run the upgrade again.
+
+Duplicate tag names are merged into the oldest tag before the unique
+constraint is added. Duplicate user emails are not merged: resolve them by
+hand first, otherwise building uq_users_email fails.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9ac1a6a06a89'
+down_revision: Union[str, None] = '377e2ee93071'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_books_created_at_uid', 'books', ['created_at', 'uid']),
+    ('ix_books_user_uid_created_at_uid', 'books', ['user_uid', 'created_at', 'uid']),
+    ('ix_reviews_book_uid', 'reviews', ['book_uid']),
+    ('ix_reviews_user_uid', 'reviews', ['user_uid']),
+    ('ix_reviews_created_at', 'reviews', ['created_at']),
+]
+
+UNIQUE_CONSTRAINTS = [
+    ('uq_users_email', 'users', ['email']),
+    ('uq_tags_name', 'tags', ['name']),
+]
+
+KEPT_TAGS = """
+    SELECT DISTINCT ON (name) name, uid
+    FROM tags
+    ORDER BY name, created_at NULLS LAST, uid
+"""
+
+
+def upgrade() -> None:
+    op.execute(f"""
+        INSERT INTO booktag (book_id, tag_id)
+        SELECT bt.book_id, kept.uid
+        FROM booktag bt
+        JOIN tags t ON t.uid = bt.tag_id
+        JOIN ({KEPT_TAGS}) kept ON kept.name = t.name
+        WHERE t.uid <> kept.uid
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute(f"""
+        DELETE FROM booktag bt
+        USING tags t, ({KEPT_TAGS}) kept
+        WHERE t.uid = bt.tag_id AND kept.name = t.name AND t.uid <> kept.uid
+    """)
+    op.execute(f"""
+        DELETE FROM tags t
+        USING ({KEPT_TAGS}) kept
+        WHERE kept.name = t.name AND t.uid <> kept.uid
+    """)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, columns in UNIQUE_CONSTRAINTS:
+            op.create_index(name, table, columns, unique=True, postgresql_concurrently=True, if_not_exists=True)
+
+    for name, table, _ in UNIQUE_CONSTRAINTS:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}")
+
+
+def downgrade() -> None:
+    for name, table, _ in UNIQUE_CONSTRAINTS:
+        op.drop_constraint(name, table, type_='unique')
+
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,50 @@
+"""add indexes serving the filtered admin review listing
+
+Revision ID: a7b3d5e9f1c4
+Revises: f6a2c4d8e0b3
+Create Date: 2026-10-18 18:47:03.384126
+
+ix_reviews_created_at and ix_reviews_user_uid are prefixes of the new
+indexes and are dropped once those exist. Built concurrently, see
+9ac1a6a06a89.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b3d5e9f1c4'
+down_revision: Union[str, None] = 'f6a2c4d8e0b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_reviews_created_at_uid', 'reviews', ['created_at', 'uid']),
+    ('ix_reviews_user_uid_created_at_uid', 'reviews', ['user_uid', 'created_at', 'uid']),
+    ('ix_reviews_rating_created_at_uid', 'reviews', ['rating', 'created_at', 'uid']),
+]
+
+REPLACED = [
+    ('ix_reviews_created_at', 'reviews', ['created_at']),
+    ('ix_reviews_user_uid', 'reviews', ['user_uid']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _ in REPLACED:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
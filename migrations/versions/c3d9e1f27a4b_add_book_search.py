@@ -0,0 +1,70 @@
+"""add book full-text search
+
+Revision ID: c3d9e1f27a4b
+Revises: 9ac1a6a06a89
+Create Date: 2026-10-18 12:02:17.418305
+
+Adds the generated search_vector column on books with a GIN index, and
+trigram GIN indexes on title and author for fuzzy matching. pg_trgm is a
+contrib extension: it must be available on the server and creating it
+needs a role allowed to (superuser, or the owner of the database on
+Postgres 13+ since it is a trusted extension).
+
+Adding a stored generated column rewrites the books table under an ACCESS
+EXCLUSIVE lock, run this upgrade in a maintenance window on large catalogs.
+The indexes are then built concurrently.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d9e1f27a4b'
+down_revision: Union[str, None] = '9ac1a6a06a89'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(publisher, '')), 'C')"
+)
+
+TRIGRAM_INDEXES = [
+    ('ix_books_title_trgm', 'title'),
+    ('ix_books_author_trgm', 'author'),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        'books',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_DOCUMENT, persisted=True)),
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_books_search_vector', 'books', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+        for name, column in TRIGRAM_INDEXES:
+            op.create_index(
+                name, 'books', [column],
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in TRIGRAM_INDEXES:
+            op.drop_index(name, table_name='books', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_books_search_vector', table_name='books', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('books', 'search_vector')
@@ -0,0 +1,46 @@
+"""add indexes serving filtered and sorted book listings
+
+Revision ID: d4e8a2b6c1f9
+Revises: c3d9e1f27a4b
+Create Date: 2026-10-18 16:05:12.208734
+
+Built with CREATE INDEX CONCURRENTLY outside of the migration transaction,
+see 9ac1a6a06a89 for what to do when a build fails.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e8a2b6c1f9'
+down_revision: Union[str, None] = 'c3d9e1f27a4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_books_published_date_uid', 'books', ['published_date', 'uid']),
+    ('ix_books_title_uid', 'books', ['title', 'uid']),
+    ('ix_books_page_count_uid', 'books', ['page_count', 'uid']),
+    ('ix_books_language_created_at_uid', 'books', ['language', 'created_at', 'uid']),
+    ('ix_books_language_title_uid', 'books', ['language', 'title', 'uid']),
+    ('ix_books_author_published_date_uid', 'books', ['author', 'published_date', 'uid']),
+    ('ix_books_author_title_uid', 'books', ['author', 'title', 'uid']),
+    ('ix_books_publisher_published_date_uid', 'books', ['publisher', 'published_date', 'uid']),
+    ('ix_booktag_tag_id_book_id', 'booktag', ['tag_id', 'book_id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
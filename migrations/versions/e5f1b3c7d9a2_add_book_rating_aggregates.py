@@ -0,0 +1,86 @@
+"""add rating aggregates to books
+
+Revision ID: e5f1b3c7d9a2
+Revises: d4e8a2b6c1f9
+Create Date: 2026-10-18 17:21:40.615309
+
+The columns get constant defaults, which Postgres adds without rewriting
+the table. They are backfilled from the reviews in one statement, which
+locks the reviewed books until the migration commits. Reviews written by
+the old code while or after upgrading are not counted, run the
+reconcile_book_ratings task once the new code is deployed.
+
+The sort indexes are built concurrently, see 9ac1a6a06a89.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f1b3c7d9a2'
+down_revision: Union[str, None] = 'd4e8a2b6c1f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COUNT_COLUMNS = ['review_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+INDEXES = [
+    ('ix_books_average_rating_uid', 'books', ['average_rating', 'uid']),
+    ('ix_books_review_count_uid', 'books', ['review_count', 'uid']),
+]
+
+BACKFILL = """
+    UPDATE books SET
+        review_count = counts.review_count,
+        rating_sum = counts.rating_sum,
+        rating_1 = counts.rating_1,
+        rating_2 = counts.rating_2,
+        rating_3 = counts.rating_3,
+        rating_4 = counts.rating_4,
+        rating_5 = counts.rating_5,
+        average_rating = counts.rating_sum::float8 / counts.review_count,
+        updated_at = :now
+    FROM (
+        SELECT
+            book_uid,
+            count(*) AS review_count,
+            sum(rating) AS rating_sum,
+            count(*) FILTER (WHERE rating = 1) AS rating_1,
+            count(*) FILTER (WHERE rating = 2) AS rating_2,
+            count(*) FILTER (WHERE rating = 3) AS rating_3,
+            count(*) FILTER (WHERE rating = 4) AS rating_4,
+            count(*) FILTER (WHERE rating = 5) AS rating_5
+        FROM reviews
+        WHERE rating BETWEEN 1 AND 5
+        GROUP BY book_uid
+    ) counts
+    WHERE books.uid = counts.book_uid
+"""
+
+
+def upgrade() -> None:
+    for name in COUNT_COLUMNS:
+        op.add_column('books', sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('average_rating', sa.Float(), server_default='0', nullable=False))
+
+    # stamped with the app clock like every other write of updated_at
+    op.execute(sa.text(BACKFILL).bindparams(now=datetime.now()))
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('books', 'average_rating')
+    for name in reversed(COUNT_COLUMNS):
+        op.drop_column('books', name)
@@ -0,0 +1,45 @@
+"""add indexes serving the paginated reviews of a book
+
+Revision ID: f6a2c4d8e0b3
+Revises: e5f1b3c7d9a2
+Create Date: 2026-10-18 18:02:55.917460
+
+ix_reviews_book_uid is a prefix of both new indexes and is dropped once
+they exist. Built concurrently, see 9ac1a6a06a89.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a2c4d8e0b3'
+down_revision: Union[str, None] = 'e5f1b3c7d9a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_reviews_book_uid_created_at_uid', 'reviews', ['book_uid', 'created_at', 'uid']),
+    ('ix_reviews_book_uid_rating_created_at_uid', 'reviews', ['book_uid', 'rating', 'created_at', 'uid']),
+]
+
+REPLACED = ('ix_reviews_book_uid', 'reviews', ['book_uid'])
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        name, table, _ = REPLACED
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        name, table, columns = REPLACED
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -1,20 +1,32 @@
 # Inside main.py title
-from fastapi import FastAPI,status
+import asyncio
+from fastapi import FastAPI,status,Response
 from src.books.routes import book_router
 from src.auth.routes import auth_router
 from src.reviews.routes import review_router
 from src.tags.routes import tags_router
 from contextlib import asynccontextmanager
 from src.db.main import init_db
+from src.db.redis import close_redis, init_redis, listen_for_auth_invalidations
+from src.auth.dependencies import handle_auth_invalidation
 from src.errors import register_all_errors
 from src.middleware import register_middleware
+from src.log import start_logging, stop_logging
+from src.metrics import render_metrics
 
-# @asynccontextmanager
-# async def life_span(app:FastAPI):
-#     print(f"server is starting...")
-#     await init_db()
-#     yield
-#     print(f"server has been stopped...")
+@asynccontextmanager
+async def life_span(app:FastAPI):
+    start_logging()
+    await init_redis()
+    invalidation_listener = asyncio.create_task(
+        listen_for_auth_invalidations(handle_auth_invalidation)
+    )
+    yield
+    invalidation_listener.cancel()
+    # let it hand its connection back before the pool closes
+    await asyncio.gather(invalidation_listener, return_exceptions=True)
+    await close_redis()
+    stop_logging()
 
 version = 'v1'
 
@@ -27,7 +39,8 @@ app = FastAPI(
     contact={
         "email":"princekumardobariya@gmail.com"
     },
-    openapi_url=f"/api/{version}/openapi.json"
+    openapi_url=f"/api/{version}/openapi.json",
+    lifespan=life_span
 )
 
 register_all_errors(app)
@@ -36,4 +49,9 @@ register_middleware(app)
 app.include_router(book_router,prefix=f"/api/{version}/books", tags=['books'])
 app.include_router(auth_router,prefix=f"/api/{version}/auth", tags=['auth'])
 app.include_router(review_router, prefix=f"/api/{version}/reviews", tags=["reviews"]) 
-app.include_router(tags_router, prefix=f"/api/{version}/tags", tags=["tags"]) 
\ No newline at end of file
+app.include_router(tags_router, prefix=f"/api/{version}/tags", tags=["tags"])
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Per-process LRU cache whose entries also expire after a TTL.
+    It is only touched from the event loop, so it does no locking.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._evict(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store a value for at most the cache TTL, or `ttl` if shorter"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return False
+        if key in self._data:
+            self._evict(key)
+        self._data[key] = (time.monotonic() + ttl, value)
+        while len(self._data) > self.maxsize:
+            self._evict(next(iter(self._data)))
+        return True
+
+    def pop(self, key: Hashable) -> None:
+        if key in self._data:
+            self._evict(key)
+
+    def clear(self) -> None:
+        for key in list(self._data):
+            self._evict(key)
+
+    def _evict(self, key: Hashable) -> None:
+        _, value = self._data.pop(key)
+        self._on_evict(key, value)
+
+    def _on_evict(self, key: Hashable, value: Any) -> None:
+        pass
+
+
+class TokenCache(TTLCache):
+    """
+    Claims of tokens that passed signature and blocklist checks.
+    Entries are looked up by the raw token and indexed by jti so a
+    revocation can evict them; none outlives the token's own exp.
+
+    generation changes with every invalidation. Read it before checking
+    the blocklist and pass it to add(): a token revoked while it was
+    being checked is then not cached, the next request checks it again.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        super().__init__(maxsize, ttl)
+        self._tokens_by_jti: dict[str, str] = {}
+        self.generation = 0
+
+    def add(self, token: str, token_data: dict, generation: int) -> None:
+        if generation != self.generation:
+            return
+        if self.set(token, token_data, ttl=token_data["exp"] - time.time()):
+            self._tokens_by_jti[token_data["jti"]] = token
+
+    def invalidate_jti(self, jti: str) -> None:
+        # also when the token is not cached, it may be on its way in
+        self.generation += 1
+        token = self._tokens_by_jti.get(jti)
+        if token is not None:
+            self.pop(token)
+
+    def clear(self) -> None:
+        self.generation += 1
+        super().clear()
+
+    def _on_evict(self, token: str, token_data: dict) -> None:
+        self._tokens_by_jti.pop(token_data["jti"], None)
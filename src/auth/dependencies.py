@@ -1,21 +1,35 @@
 from fastapi import Depends, HTTPException, Request,status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from src.auth.cache import TokenCache
 from src.auth.utils import decode_token
+from src.config import Config
 from src.db.redis import token_in_blocklist
 from src.db.main import get_session
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.auth.service import UserService
-from src.db.models import User
-from typing import List, Any
+from src.auth.schemas import UserPrincipal
+from src.auth.service import UserService, principal_cache
+from typing import List, Any, Optional
 from src.errors import (
     AccountNotVerified,
     InvalidToken,
     RefreshTokenRequired,
     AccessTokenRequired,
-    InsufficientPermission
+    InsufficientPermission,
+    UserNotFound
 )
 
 user_service = UserService()
+token_cache = TokenCache(maxsize=Config.TOKEN_CACHE_SIZE, ttl=Config.TOKEN_CACHE_TTL)
+
+def handle_auth_invalidation(kind:str, key:Optional[str]) -> None:
+    """Apply an invalidation published by any worker to this process' caches"""
+    if kind == "jti":
+        token_cache.invalidate_jti(key)
+    elif kind == "user":
+        principal_cache.pop(key)
+    elif kind == "reset":
+        token_cache.clear()
+        principal_cache.clear()
 
 class TokenBearer(HTTPBearer):
     
@@ -25,18 +39,18 @@ class TokenBearer(HTTPBearer):
     async def __call__(self, request: Request) -> HTTPAuthorizationCredentials | None:
         creds =  await super().__call__(request)
         token = creds.credentials
-        token_data = decode_token(token=token)
+        token_data = token_cache.get(token)
 
-        if not self.token_valid(token=token):
-            raise InvalidToken()
-        if await token_in_blocklist(token_data['jti']):
-            raise InvalidToken()
+        if token_data is None:
+            token_data = decode_token(token=token)
+            if token_data is None:
+                raise InvalidToken()
+            generation = token_cache.generation
+            if await token_in_blocklist(token_data['jti']):
+                raise InvalidToken()
+            token_cache.add(token, token_data, generation)
         self.verify_token_data(token_data=token_data)
         return token_data
-
-    def token_valid(self, token:str) -> bool:
-        token_data = decode_token(token=token)
-        return token_data is not None
     
     def verify_token_data(self, token_data):
         raise NotImplementedError("Please Override this method in child classes")
@@ -55,14 +69,16 @@ class RefreshTokenBearer(TokenBearer):
 async def get_current_user(token_details:dict = Depends(AccessTokenBearer()),
                      session: AsyncSession = Depends(get_session)):
     user_email = token_details['user']['email']
-    user = await user_service.get_user_by_email(user_email,session)
+    user = await user_service.get_principal_by_email(user_email,session)
+    if user is None:
+        raise UserNotFound()
     return user
 
 class RoleChecker:
     def __init__(self,allowed_roles:List[str])->None:
         self.allowed_roles = allowed_roles
 
-    def __call__(self, current_user:User=Depends(get_current_user))->Any:
+    def __call__(self, current_user:UserPrincipal=Depends(get_current_user))->Any:
         if not current_user.is_verified:
             raise AccountNotVerified()
         if current_user.role in self.allowed_roles:
@@ -5,29 +5,35 @@ from src.auth.schemas import PasswordResetConfirmModel, PasswordResetRequestMode
 from src.auth.service import UserService
 from src.config import Config
 from src.db.main import get_session
-from src.auth.utils import generate_password_hash,create_access_token, create_url_safe_token, decode_token, decode_url_safe_token, verify_password
+from src.db.loading import USER_LIBRARY
+from src.auth.utils import check_password, create_access_token, create_url_safe_token, decode_token, decode_url_safe_token, hash_password
 from datetime import timedelta, datetime
 from src.auth.dependencies import RefreshTokenBearer, AccessTokenBearer, get_current_user, RoleChecker
 from src.db.redis import add_jti_to_blocklist
 from src.constants import ALLOWED_ROLES
 from src.errors import UserNotFound
-from src.mail import mail, create_message
-from src.celery_tasks import send_email 
+from src.celery_tasks import send_template_email
+from src.rate_limit import RateLimit, RateLimiter
 
 REFRESH_TOKEN_EXPIRY = 2
 
+# login and signup each run bcrypt, the others enqueue emails
+login_limiter = RateLimiter("login", per_ip=RateLimit(20, 60), per_user=RateLimit(5, 60), per_route=RateLimit(600, 60))
+signup_limiter = RateLimiter("signup", per_ip=RateLimit(5, 3600), per_route=RateLimit(300, 60))
+password_reset_limiter = RateLimiter("password_reset", per_ip=RateLimit(5, 3600), per_user=RateLimit(3, 3600), per_route=RateLimit(300, 60))
+send_mail_limiter = RateLimiter("send_mail", per_ip=RateLimit(10, 3600), per_route=RateLimit(60, 60))
+
 auth_router = APIRouter()
 user_service = UserService()
 role_checker = RoleChecker(allowed_roles=ALLOWED_ROLES)
 
-@auth_router.post('/send_mail')
+@auth_router.post('/send_mail', dependencies=[Depends(send_mail_limiter)])
 async def send_mail_bulk(emails:Email):
     emails = emails.addresses
-    html = "<h1>Welcome to the Bookly app</h1>"
-    send_email.delay(emails,"Welcome",html)
+    send_template_email.delay(emails,"welcome.html",{})
     return {"message":"Email sent successfully"}
 
-@auth_router.post('/signup', status_code=status.HTTP_201_CREATED)
+@auth_router.post('/signup', status_code=status.HTTP_201_CREATED, dependencies=[Depends(signup_limiter)])
 async def create_user_account(user_data:UserCreateModel,
                               bg_tasks:BackgroundTasks,
                             session: AsyncSession = Depends(get_session)):
@@ -38,28 +44,23 @@ async def create_user_account(user_data:UserCreateModel,
     new_user = await user_service.create_user(user_data,session)
 
     token = create_url_safe_token({"email": email})
-
-    link = f"http://{Config.DOMAIN}/api/v1/auth/verify/{token}"
-
-    html_message = f"""
-    <h1>Verify your Email</h1>
-    <p>Please click this <a href="{link}">link</a> to verify your email</p>
-    """
-    send_email.delay(email,"Verify your email",html_message)
+    send_template_email.delay([email],"verify_email.html",{"token": token})
 
     return {
         "message": "Account Created! Check email to verify your account",
         "user": new_user,
     }
 
-@auth_router.post('/login')
+@auth_router.post('/login', dependencies=[Depends(login_limiter)])
 async def login_users(login_data: UserLoginModel, session: AsyncSession=Depends(get_session)):
     email = login_data.email
     password = login_data.password
     user = await user_service.get_user_by_email(email=email,session=session)
     if user:
-        password_valid = verify_password(password,user.password_hash)
+        password_valid, new_hash = await check_password(password,user.password_hash)
         if password_valid:
+            if new_hash:
+                await user_service.update_user(user, {"password_hash": new_hash}, session)
             access_token = create_access_token(
                 user_data={
                     'email' : email,
@@ -105,8 +106,9 @@ async def get_new_access_token(token_details:dict = Depends(RefreshTokenBearer()
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="Invalid or Expired token")
 
 @auth_router.get('/me',response_model=UserBooksModel)
-async def get_curr_user(user = Depends(get_current_user), _:bool=Depends(role_checker)):
-    return user
+async def get_curr_user(user = Depends(get_current_user), _:bool=Depends(role_checker),
+                        session: AsyncSession = Depends(get_session)):
+    return await user_service.get_user_by_email(user.email, session, options=USER_LIBRARY)
 
 @auth_router.get('/logout')
 async def revoke_token(token_details:dict=Depends(AccessTokenBearer())):
@@ -144,19 +146,12 @@ async def verify_user_account(token: str, session: AsyncSession = Depends(get_se
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
     )
 
-@auth_router.post("/password-reset-request")
+@auth_router.post("/password-reset-request", dependencies=[Depends(password_reset_limiter)])
 async def password_reset_request(email_data: PasswordResetRequestModel):
     email = email_data.email
 
     token = create_url_safe_token({"email": email})
-
-    link = f"http://{Config.DOMAIN}/api/v1/auth/password-reset-confirm/{token}"
-
-    html_message = f"""
-    <h1>Reset Your Password</h1>
-    <p>Please click this <a href="{link}">link</a> to Reset Your Password</p>
-    """
-    send_email.delay([email],"Reset Your Password",html_message)
+    send_template_email.delay([email],"password_reset.html",{"token": token})
     return JSONResponse(
         content={
             "message": "Please check your email for instructions to reset your password",
@@ -189,7 +184,7 @@ async def reset_account_password(
         if not user:
             raise UserNotFound()
 
-        passwd_hash = generate_password_hash(new_password)
+        passwd_hash = await hash_password(new_password)
         await user_service.update_user(user, {"password_hash": passwd_hash}, session)
 
         return JSONResponse(
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List
 import uuid
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from src.books.schemas import Book
 from src.reviews.schemas import ReviewModel
@@ -24,6 +24,15 @@ class UserModel(BaseModel):
     created_at: datetime 
     updated_at: datetime 
 
+class UserPrincipal(BaseModel):
+    """The columns authorization needs, cached per process"""
+    model_config = ConfigDict(frozen=True)
+
+    uid: uuid.UUID
+    email: str
+    role: str
+    is_verified: bool
+
 class UserBooksModel(UserModel):
     books: List[Book]
     reviews: List[ReviewModel]
@@ -1,17 +1,44 @@
+import logging
+from redis.exceptions import RedisError
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.db.models import User
+from src.db.loading import USER_SUMMARY
+from src.db.redis import publish_auth_invalidation
 from sqlmodel import select
-from src.auth.utils import generate_password_hash, verify_password
-from src.auth.schemas import UserCreateModel
+from src.auth.cache import TTLCache
+from src.auth.utils import hash_password
+from src.auth.schemas import UserCreateModel, UserPrincipal
+from src.config import Config
 from src.constants import USER_ROLE
 
+logger = logging.getLogger("bookly.auth")
+
+# fields that change what a cached principal is allowed to do
+PRINCIPAL_FIELDS = {"role", "is_verified", "password_hash"}
+
+principal_cache = TTLCache(maxsize=Config.PRINCIPAL_CACHE_SIZE, ttl=Config.PRINCIPAL_CACHE_TTL)
+
 class UserService:
 
-    async def get_user_by_email(self, email:str, session: AsyncSession):
-        statement = select(User).where(User.email==email)
+    async def get_user_by_email(self, email:str, session: AsyncSession, options:tuple=USER_SUMMARY):
+        statement = select(User).where(User.email==email).options(*options)
         result = await session.exec(statement=statement)
         user = result.first()
         return user
+
+    async def get_principal_by_email(self, email:str, session: AsyncSession):
+        """Load only the auth columns of a user, served from a short-lived per-process cache"""
+        principal = principal_cache.get(email)
+        if principal is not None:
+            return principal
+        statement = select(User.uid, User.email, User.role, User.is_verified).where(User.email==email)
+        result = await session.exec(statement=statement)
+        row = result.first()
+        if row is None:
+            return None
+        principal = UserPrincipal.model_validate(row._mapping)
+        principal_cache.set(email, principal)
+        return principal
     
     async def user_exists(self, email:str, session: AsyncSession):
         user = await self.get_user_by_email(email=email,session=session)
@@ -23,7 +50,7 @@ class UserService:
         new_user = User(
             **user_data_dict
         )
-        new_user.password_hash = generate_password_hash(user_data_dict["password"])
+        new_user.password_hash = await hash_password(user_data_dict["password"])
         new_user.role = USER_ROLE
         session.add(new_user)
 
@@ -34,4 +61,11 @@ class UserService:
         for k, v in user_data.items():
             setattr(user,k,v)
         await session.commit()
+        if PRINCIPAL_FIELDS.intersection(user_data):
+            principal_cache.pop(user.email)
+            try:
+                await publish_auth_invalidation("user", user.email)
+            except RedisError as e:
+                # other workers fall back to PRINCIPAL_CACHE_TTL expiry
+                logger.warning("could not publish principal invalidation: %s", e)
         return user
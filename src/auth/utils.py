@@ -1,17 +1,29 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 from fastapi import HTTPException
 from passlib.context import CryptContext
 from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
 import jwt
 import uuid
 from src.config import Config
+from src.errors import ServerBusy
 import logging
 
+# pinning min/max rounds to the configured cost makes passlib flag hashes
+# made with any other cost, so they get rehashed on the next login
 password_context = CryptContext(
-    schemes=['bcrypt']
+    schemes=['bcrypt'],
+    bcrypt__default_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=Config.BCRYPT_ROUNDS,
 )
 ACCESS_TOKEN_EXPIRY = 60
 
+_hash_executor: Optional[Executor] = None
+_hash_slots = asyncio.Semaphore(Config.PASSWORD_HASH_WORKERS)
+
 def generate_password_hash(password:str)->str:
     hash_pswd = password_context.hash(password)
     return hash_pswd
@@ -19,6 +31,46 @@ def generate_password_hash(password:str)->str:
 def verify_password(password:str, hash:str)->bool:
     return password_context.verify(secret=password,hash=hash)
 
+def verify_and_update_password(password:str, hash:str)->Tuple[bool, Optional[str]]:
+    return password_context.verify_and_update(secret=password,hash=hash)
+
+def _get_hash_executor() -> Executor:
+    global _hash_executor
+    if _hash_executor is None:
+        if Config.PASSWORD_HASH_EXECUTOR == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS)
+        else:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+            )
+    return _hash_executor
+
+async def _run_password_job(func, *args):
+    """
+    Run a bcrypt call off the event loop.
+    At most PASSWORD_HASH_WORKERS calls run at once; callers waiting longer
+    than PASSWORD_HASH_QUEUE_TIMEOUT for a slot are rejected with ServerBusy.
+    """
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=Config.PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ServerBusy()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        _hash_slots.release()
+
+async def hash_password(password:str)->str:
+    return await _run_password_job(generate_password_hash, password)
+
+async def check_password(password:str, hash:str)->Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the hashing pool.
+    Returns whether it matched and, if the stored hash uses an outdated cost, a replacement hash.
+    """
+    return await _run_password_job(verify_and_update_password, password, hash)
+
 def create_access_token(user_data: dict,expiry: timedelta = None, refresh: bool=False):
     payload = {}
     payload['user'] = user_data
@@ -40,7 +92,7 @@ def decode_token(token:str)->dict:
             algorithms=[Config.JWT_ALGORITHM]
         )
         return token_data
-    except jwt.PyJWKError as e:
+    except jwt.PyJWTError as e:
         logging.exception(e)
         return None
 
@@ -0,0 +1,184 @@
+"""
+Bulk book import from streamed NDJSON or CSV.
+
+The upload is parsed as it arrives, one record at a time. Valid rows are
+buffered up to IMPORT_CHUNK_SIZE and written with one multi-row INSERT for
+the books, one bulk tag lookup and one for the tag links, then committed, so
+memory stays bounded by the chunk whatever the file size and a failure only
+loses the chunk in progress.
+"""
+import codecs
+import csv
+import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.books.schemas import BookImportError, BookImportReport, BookImportRow
+from src.constants import IMPORT_CHUNK_SIZE, MAX_CSV_RECORD_SIZE, MAX_IMPORT_ERRORS
+from src.db.cache import TAGS_KEY, response_cache
+from src.db.models import Book, BookTag
+from src.tags.service import TagService
+
+NDJSON_TYPES = {"application/x-ndjson", "application/jsonl", "application/json-lines"}
+CSV_TYPES = {"text/csv", "application/csv"}
+
+# (row number, parsed record or the reason it could not be parsed)
+Record = Tuple[int, Union[dict, str]]
+
+tag_service = TagService()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines, without their line endings"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.removesuffix("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.removesuffix("\r")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """One JSON object per line, numbered by line"""
+    row = 0
+    async for line in iter_lines(chunks):
+        row += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, f"invalid JSON: {e.msg}"
+            continue
+        yield row, record if isinstance(record, dict) else "expected a JSON object"
+
+
+def parse_csv_record(text: str) -> List[str]:
+    return next(csv.reader([text]))
+
+
+async def iter_csv(
+    chunks: AsyncIterator[bytes], max_record_size: int = MAX_CSV_RECORD_SIZE
+) -> AsyncIterator[Record]:
+    """Rows of a CSV file with a header line, numbered from the first data row.
+    Quoted values may span lines, a record ends once its quotes are balanced.
+    A record still open past max_record_size characters, most likely a stray
+    quote, is reported as one failed row and parsing resumes on the next line,
+    so it can't swallow the rest of the upload."""
+    header = None
+    row = 0
+    record = ""
+    async for line in iter_lines(chunks):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            if len(record) > max_record_size:
+                record = ""
+                row += 1
+                yield row, f"quoted value not closed within {max_record_size} characters"
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = parse_csv_record(text)
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row, dict(zip(header, values))
+    if record:
+        yield row + 1, "unterminated quoted value"
+
+
+def format_errors(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in error.errors(include_url=False)
+    ]
+
+
+class BookImporter:
+    def __init__(self, user_uid: str, session: AsyncSession, chunk_size: int = IMPORT_CHUNK_SIZE) -> None:
+        self.user_uid = user_uid
+        self.session = session
+        self.chunk_size = chunk_size
+        self.report = BookImportReport(rows=0, imported=0, failed=0, errors=[])
+        self.created_tags = False
+
+    def add_error(self, row: int, errors: List[str]) -> None:
+        self.report.failed += 1
+        if len(self.report.errors) < MAX_IMPORT_ERRORS:
+            self.report.errors.append(BookImportError(row=row, errors=errors))
+        else:
+            self.report.errors_truncated = True
+
+    async def run(self, records: AsyncIterator[Record]) -> BookImportReport:
+        chunk: List[BookImportRow] = []
+        async for row, record in records:
+            self.report.rows += 1
+            if isinstance(record, str):
+                self.add_error(row, [record])
+                continue
+            try:
+                chunk.append(BookImportRow.model_validate(record))
+            except ValidationError as e:
+                self.add_error(row, format_errors(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                await self.write_chunk(chunk)
+                chunk = []
+        if chunk:
+            await self.write_chunk(chunk)
+        if self.created_tags:
+            await response_cache.new_generation(TAGS_KEY)
+        return self.report
+
+    async def write_chunk(self, chunk: List[BookImportRow]) -> None:
+        now = datetime.now()
+        books = []
+        links = []
+        tag_names = list(dict.fromkeys(name for book in chunk for name in book.tags))
+        uids, created = await tag_service.resolve_tags(tag_names, self.session)
+        tag_uids = dict(zip(tag_names, uids))
+        self.created_tags = self.created_tags or bool(created)
+
+        for book in chunk:
+            book_uid = uuid.uuid4()
+            books.append({
+                "uid": book_uid,
+                **book.model_dump(exclude={"tags"}),
+                "user_uid": self.user_uid,
+                "created_at": now,
+                "updated_at": now,
+            })
+            links.extend({"book_id": book_uid, "tag_id": tag_uids[name]} for name in dict.fromkeys(book.tags))
+
+        # core executemany on the tables: the dialect batches it into multi-row
+        # INSERTs compiled once, a .values() list would be compiled per chunk
+        # and ORM bulk inserts spend their time building mappings
+        await self.session.execute(insert(Book.__table__), books)
+        if links:
+            await self.session.execute(insert(BookTag.__table__).on_conflict_do_nothing(), links)
+        await self.session.commit()
+        self.report.imported += len(books)
+
+
+def records_for(content_type: str, chunks: AsyncIterator[bytes]) -> Optional[AsyncIterator[Record]]:
+    """Parser matching the upload's media type, None when it is not supported"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return iter_ndjson(chunks)
+    if media_type in CSV_TYPES:
+        return iter_csv(chunks)
+    return None
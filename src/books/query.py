@@ -0,0 +1,169 @@
+"""
+Filters and sort orders for book listings.
+
+Only combinations an index can serve are accepted, anything else raises
+UnsupportedBookQuery instead of running a sequential scan and sort:
+
+- one sort, each backed by an index on (sort column, uid);
+- at most one equality filter (owner, language, author, publisher or tag),
+  and only with the sorts listed for it in BOOK_LIST_INDEXES;
+- range filters only on the column the listing is sorted by, the index
+  then covers the range as well.
+
+Every supported combination is listed in BOOK_LIST_INDEXES together with
+the index serving it; a new entry needs its index declared on the model
+and created by a migration.
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlmodel import select
+
+from src.db.models import Book, BookTag, Tag
+from src.db.pagination import decode_cursor, keyset_after
+from src.errors import InvalidCursor, UnsupportedBookQuery
+
+
+@dataclass(frozen=True)
+class BookSort:
+    column: Any
+    descending: bool
+    # type of the sort value in a cursor, a cursor of another sort is rejected
+    value_type: type
+
+
+DEFAULT_BOOK_SORT = "newest"
+
+SORTS: Dict[str, BookSort] = {
+    "newest": BookSort(Book.created_at, True, datetime),
+    "oldest": BookSort(Book.created_at, False, datetime),
+    "published": BookSort(Book.published_date, True, date),
+    "title": BookSort(Book.title, False, str),
+    "pages": BookSort(Book.page_count, False, int),
+    "top_rated": BookSort(Book.average_rating, True, float),
+    "most_reviewed": BookSort(Book.review_count, True, int),
+}
+
+# equality filter -> column sorted by -> index serving the combination
+BOOK_LIST_INDEXES: Dict[Tuple[Optional[str], str], str] = {
+    (None, "created_at"): "ix_books_created_at_uid",
+    (None, "published_date"): "ix_books_published_date_uid",
+    (None, "title"): "ix_books_title_uid",
+    (None, "page_count"): "ix_books_page_count_uid",
+    (None, "average_rating"): "ix_books_average_rating_uid",
+    (None, "review_count"): "ix_books_review_count_uid",
+    ("user_uid", "created_at"): "ix_books_user_uid_created_at_uid",
+    ("language", "created_at"): "ix_books_language_created_at_uid",
+    ("language", "title"): "ix_books_language_title_uid",
+    ("author", "published_date"): "ix_books_author_published_date_uid",
+    ("author", "title"): "ix_books_author_title_uid",
+    ("publisher", "published_date"): "ix_books_publisher_published_date_uid",
+    # tagged books are found through ix_booktag_tag_id_book_id, then sorted
+    ("tag", "created_at"): "ix_booktag_tag_id_book_id",
+    ("tag", "title"): "ix_booktag_tag_id_book_id",
+}
+
+RANGE_COLUMNS = {
+    "published": "published_date",
+    "pages": "page_count",
+}
+
+
+class BookFilters(BaseModel):
+    user_uid: Optional[uuid.UUID] = None
+    language: Optional[str] = None
+    author: Optional[str] = None
+    publisher: Optional[str] = None
+    tag: Optional[str] = None
+    published_from: Optional[date] = None
+    published_to: Optional[date] = None
+    min_pages: Optional[int] = None
+    max_pages: Optional[int] = None
+
+
+def equality_filter(filters: BookFilters) -> Optional[str]:
+    used = [
+        name
+        for name in ("user_uid", "language", "author", "publisher", "tag")
+        if getattr(filters, name) is not None
+    ]
+    if len(used) > 1:
+        raise UnsupportedBookQuery(f"filter on at most one of {', '.join(used)}")
+    return used[0] if used else None
+
+
+def ranges_used(filters: BookFilters) -> Dict[str, bool]:
+    return {
+        "published": filters.published_from is not None or filters.published_to is not None,
+        "pages": filters.min_pages is not None or filters.max_pages is not None,
+    }
+
+
+def tag_uid_statement(filters: BookFilters):
+    """Select of the uid of the tag filtered on, resolved before listing"""
+    return select(Tag.uid).where(Tag.name == filters.tag)
+
+
+def book_list_statement(
+    filters: BookFilters,
+    sort: str,
+    cursor: Optional[str],
+    limit: int,
+    tag_uid: Optional[uuid.UUID] = None,
+):
+    """Keyset paginated select of the books matching filters, in sort order.
+    A tag filter needs tag_uid, see tag_uid_statement."""
+    if sort not in SORTS:
+        raise UnsupportedBookQuery(f"unknown sort {sort!r}")
+    book_sort = SORTS[sort]
+    sort_column = book_sort.column.key
+
+    equality = equality_filter(filters)
+    if (equality, sort_column) not in BOOK_LIST_INDEXES:
+        raise UnsupportedBookQuery(f"sort {sort!r} is not supported with a {equality} filter")
+    for range_name, used in ranges_used(filters).items():
+        if used and RANGE_COLUMNS[range_name] != sort_column:
+            raise UnsupportedBookQuery(f"{range_name} range filters need sort={range_name}")
+
+    statement = select(Book)
+    if filters.user_uid is not None:
+        statement = statement.where(Book.user_uid == filters.user_uid)
+    if filters.language is not None:
+        statement = statement.where(Book.language == filters.language)
+    if filters.author is not None:
+        statement = statement.where(Book.author == filters.author)
+    if filters.publisher is not None:
+        statement = statement.where(Book.publisher == filters.publisher)
+    if filters.tag is not None:
+        # by uid rather than joining tags: with the tag known when planning,
+        # Postgres can tell a rare tag (read its links, then sort) from a
+        # common one (walk the sort index, probe the links)
+        statement = statement.where(
+            Book.uid.in_(select(BookTag.book_id).where(BookTag.tag_id == tag_uid))
+        )
+    if filters.published_from is not None:
+        statement = statement.where(Book.published_date >= filters.published_from)
+    if filters.published_to is not None:
+        statement = statement.where(Book.published_date <= filters.published_to)
+    if filters.min_pages is not None:
+        statement = statement.where(Book.page_count >= filters.min_pages)
+    if filters.max_pages is not None:
+        statement = statement.where(Book.page_count <= filters.max_pages)
+
+    values = None
+    if cursor:
+        values = decode_cursor(cursor, 2)
+        if type(values[0]) is not book_sort.value_type or not isinstance(values[1], uuid.UUID):
+            raise InvalidCursor()
+
+    columns = (book_sort.column, Book.uid)
+    return keyset_after(statement, columns, values, book_sort.descending).limit(limit + 1)
+
+
+def book_sort_key(sort: str):
+    """Cursor values of a book in the given sort order"""
+    column = SORTS[sort].column.key
+    return lambda book: (getattr(book, column), book.uid)
@@ -0,0 +1,119 @@
+"""
+Rating aggregates stored on books.
+
+Every book carries the count, sum and per-star histogram of its reviews,
+plus the average derived from them. Adding or deleting a review updates
+them with relative increments in the same transaction, see
+BookService.record_rating, so listings and sorts never aggregate `reviews`.
+
+reconcile_ratings recomputes them from the reviews, for the initial
+backfill and to repair any drift.
+"""
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Float, cast, func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db.models import Book, Review
+
+logger = logging.getLogger("bookly.ratings")
+
+RATINGS = range(1, 6)
+RECONCILE_BATCH_SIZE = 1000
+
+
+def average(rating_sum, review_count):
+    return func.coalesce(cast(rating_sum, Float) / cast(func.nullif(review_count, 0), Float), 0)
+
+
+def rating_change(rating: int, delta: int) -> dict:
+    """Update values adding (delta=1) or removing (delta=-1) one review with
+    rating, none for a rating outside 1-5 which the aggregates leave out"""
+    if rating not in RATINGS:
+        return {}
+    column = getattr(Book, f"rating_{rating}")
+    return {
+        "review_count": Book.review_count + delta,
+        "rating_sum": Book.rating_sum + delta * rating,
+        column.key: column + delta,
+        # the right-hand side sees the row before this update
+        "average_rating": average(Book.rating_sum + delta * rating, Book.review_count + delta),
+    }
+
+
+def reconcile_statement(book_uids):
+    """Update of the aggregates of book_uids that differ from their reviews"""
+    books = Book.__table__.alias("counted")
+    # reviews stored before ratings were validated may lie outside 1-5
+    reviewed = Review.rating.between(RATINGS[0], RATINGS[-1])
+    counts = (
+        select(
+            books.c.uid,
+            func.count(Review.uid).label("review_count"),
+            func.coalesce(func.sum(Review.rating), 0).label("rating_sum"),
+            *[
+                func.count(Review.uid).filter(Review.rating == rating).label(f"rating_{rating}")
+                for rating in RATINGS
+            ],
+        )
+        # outer join so books without reviews count as zeros
+        .select_from(books.outerjoin(Review, (Review.book_uid == books.c.uid) & reviewed))
+        .where(books.c.uid.in_(book_uids))
+        .group_by(books.c.uid)
+        .subquery()
+    )
+    names = ["review_count", "rating_sum", *[f"rating_{rating}" for rating in RATINGS]]
+    changed = func.row(*[getattr(Book, name) for name in names]).is_distinct_from(
+        func.row(*[counts.c[name] for name in names])
+    )
+    return (
+        update(Book)
+        .where(Book.uid == counts.c.uid, changed)
+        .values(
+            **{name: counts.c[name] for name in names},
+            average_rating=average(counts.c.rating_sum, counts.c.review_count),
+            updated_at=datetime.now(),
+        )
+        .returning(Book.uid)
+    )
+
+
+async def reconcile_ratings(
+    session: AsyncSession,
+    book_uid: Optional[str] = None,
+    batch_size: int = RECONCILE_BATCH_SIZE,
+) -> int:
+    """
+    Recompute the aggregates of one book, or of all books batch by batch,
+    committing each batch. Returns how many books were corrected.
+
+    The books of a batch are locked before their reviews are counted, so
+    a review added or deleted meanwhile either is counted or waits and
+    then applies its increment on top.
+    """
+    fixed = 0
+    last_uid = None
+    while True:
+        batch = select(Book.uid).order_by(Book.uid).limit(batch_size).with_for_update()
+        if book_uid is not None:
+            batch = batch.where(Book.uid == book_uid)
+        elif last_uid is not None:
+            batch = batch.where(Book.uid > last_uid)
+        uids = (await session.exec(batch)).all()
+        if not uids:
+            break
+
+        result = await session.exec(reconcile_statement(uids))
+        corrected = result.all()
+        await session.commit()
+
+        fixed += len(corrected)
+        if corrected:
+            logger.warning("reconciled rating aggregates of %d books", len(corrected))
+        if book_uid is not None or len(uids) < batch_size:
+            break
+        last_uid = uids[-1]
+    return fixed
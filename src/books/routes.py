@@ -1,9 +1,18 @@
-from typing import List
-from fastapi import APIRouter, HTTPException,status, Depends
-from src.books.schemas import Book, BookCreateModel, BookUpdateModel, BookDetail
-from src.books.service import BookService
-from src.constants import ALLOWED_ROLES
+from datetime import datetime
+from typing import Literal, Optional
+import uuid
+from fastapi import APIRouter, HTTPException,status, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from src.books.importer import BookImporter, records_for
+from src.books.query import DEFAULT_BOOK_SORT, SORTS, BookFilters
+from src.books.schemas import Book, BookCreateModel, BookImportReport, BookPage, BookSearchPage, BookUpdateModel, BookDetail
+from src.books.service import BOOK_EXPORT_COLUMNS, BookService
+from src.constants import ADMIN_ROLE, ALLOWED_ROLES, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.db.export import export_response
+from src.reviews.query import DEFAULT_REVIEW_SORT, REVIEW_SORTS
+from src.reviews.schemas import ReviewPage
 from src.db.main import get_session
+from src.etag import etag_matches, make_etag, not_modified
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.auth.dependencies import AccessTokenBearer, RoleChecker
 
@@ -11,18 +20,52 @@ book_router = APIRouter()
 book_service = BookService()
 access_token_bearer = AccessTokenBearer()
 role_checker = Depends(RoleChecker(allowed_roles=ALLOWED_ROLES))
+admin_role_checker = Depends(RoleChecker(allowed_roles=[ADMIN_ROLE]))
 
-@book_router.get("/", response_model=List[Book],dependencies=[role_checker])
-async def get_all_books(session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)):
-    books = await book_service.get_all_books(session)
+def book_page_etag(page:dict) -> str:
+    return make_etag(*[(book.uid, book.updated_at) for book in page["items"]], page["next_cursor"])
+
+@book_router.get("/", response_model=BookPage,dependencies=[role_checker])
+async def get_all_books(request:Request, response:Response,
+                        limit:int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                        cursor:Optional[str] = None,
+                        filters:BookFilters = Depends(),
+                        sort:Literal[tuple(SORTS)] = DEFAULT_BOOK_SORT,
+                        session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)):
+    """Books matching the filters, one page at a time. Combinations of filters
+    and sort that no index serves are rejected with unsupported_book_query."""
+    books = await book_service.get_all_books(session,limit=limit,cursor=cursor,filters=filters,sort=sort)
+    etag = book_page_etag(books)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return books
 
-@book_router.get("/user/{user_uid}", response_model=List[Book],dependencies=[role_checker])
-async def get_user_books_submissions(user_uid:str ,session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)):
-    books = await book_service.get_user_books(user_uid,session)
+@book_router.get("/user/{user_uid}", response_model=BookPage,dependencies=[role_checker])
+async def get_user_books_submissions(user_uid:str, request:Request, response:Response,
+                                     limit:int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                     cursor:Optional[str] = None,
+                                     session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)):
+    books = await book_service.get_user_books(user_uid,session,limit=limit,cursor=cursor)
+    etag = book_page_etag(books)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return books
 
 
+@book_router.get("/search", response_model=BookSearchPage,dependencies=[role_checker])
+async def search_books(q:str = Query(min_length=1, max_length=200),
+                       fuzzy:bool = True,
+                       limit:int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       cursor:Optional[str] = None,
+                       session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)):
+    """Books matching q in their title, author or publisher, best match first.
+    Matched words are wrapped in <mark> in `highlights`. fuzzy also matches
+    titles and authors spelled slightly differently."""
+    return await book_service.search_books(q,session,fuzzy=fuzzy,limit=limit,cursor=cursor)
+
+
 @book_router.post("/", status_code=status.HTTP_201_CREATED,response_model=Book,dependencies=[role_checker])
 async def create_a_book(book_data: BookCreateModel,session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)) -> dict:
     user_uid = token_details.get('user')['user_uid']
@@ -30,14 +73,65 @@ async def create_a_book(book_data: BookCreateModel,session:AsyncSession = Depend
     return new_book
 
 
+@book_router.post("/import", response_model=BookImportReport,dependencies=[admin_role_checker],
+                  openapi_extra={"requestBody": {"content": {
+                      "application/x-ndjson": {"schema": {"type": "string"}},
+                      "text/csv": {"schema": {"type": "string"}},
+                  }}})
+async def import_books(request:Request,session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)):
+    """Import books from an NDJSON or CSV body, streamed and written in chunks.
+    CSV needs a header row; tags go in a `tags` column separated by `|`."""
+    records = records_for(request.headers.get("content-type", ""), request.stream())
+    if records is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Send application/x-ndjson or text/csv")
+    user_uid = token_details.get('user')['user_uid']
+    return await BookImporter(user_uid=user_uid,session=session).run(records)
+
+
+@book_router.get("/export",dependencies=[admin_role_checker],response_class=StreamingResponse)
+async def export_books(format:Literal["ndjson","csv"] = "ndjson",
+                       user_uid:Optional[uuid.UUID] = None,
+                       created_from:Optional[datetime] = None,
+                       created_to:Optional[datetime] = None,
+                       cursor:Optional[str] = None,
+                       token_details:dict=Depends(access_token_bearer)):
+    """Stream books oldest first. Every row has a `cursor`, pass the last one
+    received to resume an interrupted export."""
+    statement = book_service.export_statement(user_uid=user_uid,created_from=created_from,created_to=created_to,cursor=cursor)
+    return export_response(statement,[column.key for column in BOOK_EXPORT_COLUMNS],("created_at","uid"),format,"books")
+
+
 @book_router.get("/{book_uid}",response_model=BookDetail,dependencies=[role_checker])
-async def get_book(book_uid: str,session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)) -> dict:
-    book = await book_service.get_book(book_uid=book_uid,session=session)
-    if book:
-        return book
+async def get_book(book_uid: str,request:Request,session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)) -> dict:
+    version = await book_service.get_book_version(book_uid=book_uid,session=session)
+    if not version:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    etag = make_etag(version.uid, version.updated_at)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    book_json = await book_service.get_book_detail_json(book_uid=book_uid,etag=etag,session=session)
+    if book_json:
+        return Response(content=book_json, media_type="application/json", headers={"ETag": etag})
     else:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
 
+@book_router.get("/{book_uid}/reviews",response_model=ReviewPage,dependencies=[role_checker])
+async def get_book_reviews(book_uid: str,request:Request,response:Response,
+                           limit:int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                           cursor:Optional[str] = None,
+                           sort:Literal[tuple(REVIEW_SORTS)] = DEFAULT_REVIEW_SORT,
+                           session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)):
+    """Reviews of a book, newest first or highest rated first, one page at a time"""
+    reviews = await book_service.get_book_reviews(book_uid,session,limit=limit,cursor=cursor,sort=sort)
+    # an empty page is the only one that can't tell whether the book exists
+    if not reviews["items"] and not await book_service.get_book_version(book_uid=book_uid,session=session):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    etag = make_etag(*[(review.uid, review.update_at) for review in reviews["items"]], reviews["next_cursor"])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return reviews
+
 @book_router.patch("/{book_uid}",response_model=Book,dependencies=[role_checker])
 async def update_book(book_uid: str,book_update_data:BookUpdateModel,session:AsyncSession = Depends(get_session),token_details:dict=Depends(access_token_bearer)) -> dict:
     updated_book = await book_service.update_book(book_uid=book_uid,update_data=book_update_data,session=session)
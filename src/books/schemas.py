@@ -1,7 +1,7 @@
 from datetime import datetime,date
-from pydantic import BaseModel
-from src.reviews.schemas import ReviewModel
-from typing import List
+from pydantic import BaseModel, Field, field_validator
+from src.reviews.schemas import ReviewPage
+from typing import Dict, List, Optional
 import uuid
 
 from src.tags.schemas import TagModel
@@ -14,9 +14,29 @@ class Book(BaseModel):
     published_date: date
     page_count: int
     language: str
+    review_count: int
+    average_rating: float
+    # number of reviews giving each rating, 1 to 5
+    rating_histogram: Dict[int, int]
     created_at: datetime
     updated_at: datetime
 
+class BookPage(BaseModel):
+    items: List[Book]
+    next_cursor: Optional[str] = None
+
+class BookHighlights(BaseModel):
+    title: str
+    author: str
+
+class BookSearchHit(Book):
+    rank: float
+    highlights: BookHighlights
+
+class BookSearchPage(BaseModel):
+    items: List[BookSearchHit]
+    next_cursor: Optional[str] = None
+
 class BookCreateModel(BaseModel):
     title: str
     author: str
@@ -33,5 +53,34 @@ class BookUpdateModel(BaseModel):
     language: str
 
 class BookDetail(Book):
-    reviews : List[ReviewModel]
-    tags:List[TagModel]
\ No newline at end of file
+    # the first page, newest first; the rest is at /books/{book_uid}/reviews
+    reviews : ReviewPage
+    tags:List[TagModel]
+
+class BookImportRow(BaseModel):
+    title: str = Field(min_length=1)
+    author: str = Field(min_length=1)
+    publisher: str
+    published_date: date
+    page_count: int = Field(ge=0)
+    language: str
+    tags: List[str] = []
+
+    @field_validator("tags", mode="before")
+    @classmethod
+    def split_tags(cls, value):
+        # CSV rows carry tags as one "fiction|classics" column
+        if isinstance(value, str):
+            return [tag.strip() for tag in value.split("|") if tag.strip()]
+        return value
+
+class BookImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class BookImportReport(BaseModel):
+    rows: int
+    imported: int
+    failed: int
+    errors: List[BookImportError]
+    errors_truncated: bool = False
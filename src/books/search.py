@@ -0,0 +1,89 @@
+"""
+Full-text book search.
+
+Matches go through the generated `search_vector` column (title, author and
+publisher, GIN indexed). With fuzzy matching on, titles and authors within
+SEARCH_SIMILARITY_THRESHOLD trigram word similarity of the query also
+match, which catches typos; that part needs the pg_trgm extension and its
+GIN indexes from the migration.
+
+Hits are ordered by rank, then uid, and paginated with a keyset on that
+pair. The rank is a pure function of the row and the query, so a cursor
+stays valid while the catalog is unchanged.
+"""
+import html
+import uuid
+from typing import Optional
+
+from sqlalchemy import Float, cast, desc, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from src.db.models import Book
+from src.db.pagination import decode_cursor, keyset_after
+from src.errors import InvalidCursor
+
+SEARCH_CONFIG = "english"
+# share of the rank given to trigram similarity, full-text matches dominate
+FUZZY_WEIGHT = 0.5
+# ts_headline markers, swapped for <mark> once the text is HTML escaped
+START_SEL, STOP_SEL = "\x01", "\x02"
+HEADLINE_OPTIONS = f"StartSel={START_SEL}, StopSel={STOP_SEL}, HighlightAll=true"
+
+
+def highlight(value: str) -> str:
+    """HTML of a ts_headline result, matched words wrapped in <mark>"""
+    return html.escape(value).replace(START_SEL, "<mark>").replace(STOP_SEL, "</mark>")
+
+
+def search_statement(query: str, fuzzy: bool, cursor: Optional[str], limit: int):
+    config = cast(literal(SEARCH_CONFIG), REGCONFIG)
+    tsquery = func.websearch_to_tsquery(config, query)
+    search_vector = Book.__table__.c.search_vector
+
+    matches = search_vector.op("@@")(tsquery)
+    rank = func.ts_rank_cd(search_vector, tsquery, 32)
+    if fuzzy:
+        matches = or_(
+            matches,
+            literal(query).op("<%")(Book.title),
+            literal(query).op("<%")(Book.author),
+        )
+        rank = rank + FUZZY_WEIGHT * func.greatest(
+            func.word_similarity(query, Book.title),
+            func.word_similarity(query, Book.author),
+        )
+    # double precision so the rank survives the round trip through a cursor
+    rank = cast(rank, Float)
+
+    values = None
+    if cursor:
+        values = decode_cursor(cursor, 2)
+        # e.g. a cursor of the book list, whose values Postgres can't compare to a rank
+        if type(values[0]) is not float or not isinstance(values[1], uuid.UUID):
+            raise InvalidCursor()
+
+    # rank and paginate on uids first, headlines are only worth computing for
+    # the rows of the page
+    page = (
+        keyset_after(select(Book.uid, rank.label("rank")).where(matches), (rank, Book.uid), values)
+        .limit(limit + 1)
+        .subquery()
+    )
+
+    return (
+        select(
+            Book,
+            page.c.rank,
+            func.ts_headline(config, Book.title, tsquery, HEADLINE_OPTIONS).label("title_highlight"),
+            func.ts_headline(config, Book.author, tsquery, HEADLINE_OPTIONS).label("author_highlight"),
+        )
+        .join(page, page.c.uid == Book.uid)
+        .order_by(desc(page.c.rank), desc(Book.uid))
+    )
+
+
+def set_similarity_threshold(threshold: float):
+    """Statement setting the `<%` threshold for the rest of the transaction"""
+    return select(
+        func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True)
+    )
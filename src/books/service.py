@@ -1,28 +1,117 @@
 
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.books.schemas import BookCreateModel, BookUpdateModel
-from sqlmodel import select, desc
-from src.db.models import Book
+from src.books.schemas import BookCreateModel, BookDetail, BookUpdateModel
+from sqlmodel import delete, select, update
+from src.db.cache import book_detail_key, response_cache
+from src.db.export import naive_datetime
+from src.db.models import Book, BookTag, Review
+from src.db.loading import BOOK_DETAIL, BOOK_SUMMARY
+from src.db.pagination import build_page, keyset
+from src.books.query import DEFAULT_BOOK_SORT, BookFilters, book_list_statement, book_sort_key, tag_uid_statement
+from src.books.ratings import rating_change
+from src.reviews.query import DEFAULT_REVIEW_SORT, book_reviews_statement, review_sort_key
+from src.books.search import highlight, search_statement, set_similarity_threshold
+from src.config import Config
+from src.constants import DEFAULT_PAGE_SIZE
 from datetime import datetime
+from typing import Optional
+
+BOOK_EXPORT_COLUMNS = (
+    Book.uid, Book.title, Book.author, Book.publisher, Book.published_date,
+    Book.page_count, Book.language, Book.user_uid, Book.created_at, Book.updated_at,
+)
 
 class BookService:
 
-    async def get_all_books(self, session:AsyncSession):
-        statement = select(Book).order_by(desc(Book.created_at))
+    async def get_all_books(self, session:AsyncSession, limit:int=DEFAULT_PAGE_SIZE, cursor:Optional[str]=None,
+                            filters:Optional[BookFilters]=None, sort:str=DEFAULT_BOOK_SORT):
+        """A page of books matching filters, raises UnsupportedBookQuery for combinations no index serves"""
+        filters = filters or BookFilters()
+        tag_uid = None
+        if filters.tag is not None:
+            tag_uid = (await session.exec(tag_uid_statement(filters))).first()
+        statement = book_list_statement(filters, sort, cursor, limit, tag_uid)
+        if filters.tag is not None and tag_uid is None:
+            return build_page([], limit, book_sort_key(sort))
         result = await session.exec(statement)
-        return result.all()
+        return build_page(result.all(), limit, book_sort_key(sort))
     
-    async def get_user_books(self,user_id:str, session:AsyncSession):
-        statement = select(Book).where(Book.user_uid==user_id).order_by(desc(Book.created_at))
-        result = await session.exec(statement)
-        return result.all()
+    async def get_user_books(self,user_id:str, session:AsyncSession, limit:int=DEFAULT_PAGE_SIZE, cursor:Optional[str]=None):
+        return await self.get_all_books(session,limit=limit,cursor=cursor,filters=BookFilters(user_uid=user_id))
+
+    async def search_books(self, query:str, session:AsyncSession, fuzzy:bool=True,
+                           limit:int=DEFAULT_PAGE_SIZE, cursor:Optional[str]=None):
+        if fuzzy:
+            await session.exec(set_similarity_threshold(Config.SEARCH_SIMILARITY_THRESHOLD))
+        result = await session.exec(search_statement(query, fuzzy, cursor, limit))
+        page = build_page(result.all(), limit, lambda row: (row.rank, row.Book.uid))
+        page["items"] = [
+            {
+                **book.model_dump(),
+                "rating_histogram": book.rating_histogram,
+                "rank": rank,
+                "highlights": {"title": highlight(title), "author": highlight(author)},
+            }
+            for book, rank, title, author in page["items"]
+        ]
+        return page
+
+    def export_statement(self, user_uid:Optional[str]=None, created_from:Optional[datetime]=None,
+                         created_to:Optional[datetime]=None, cursor:Optional[str]=None):
+        """Columns of the matching books, oldest first so rows added during an export come last"""
+        statement = select(*BOOK_EXPORT_COLUMNS)
+        if user_uid:
+            statement = statement.where(Book.user_uid==user_uid)
+        created_from, created_to = naive_datetime(created_from), naive_datetime(created_to)
+        if created_from:
+            statement = statement.where(Book.created_at>=created_from)
+        if created_to:
+            statement = statement.where(Book.created_at<created_to)
+        return keyset(statement, (Book.created_at, Book.uid), cursor, descending=False)
 
-    async def get_book(self, book_uid:str, session:AsyncSession):
-        statement = select(Book).where(Book.uid==book_uid)
+    async def get_book(self, book_uid:str, session:AsyncSession, options:tuple=BOOK_SUMMARY):
+        statement = select(Book).where(Book.uid==book_uid).options(*options)
         result = await session.exec(statement)
         book = result.first()
         return book if book else None
 
+    async def get_book_version(self, book_uid:str, session:AsyncSession):
+        """uid and updated_at of a book without loading anything else, None if it does not exist"""
+        statement = select(Book.uid, Book.updated_at).where(Book.uid==book_uid)
+        result = await session.exec(statement)
+        return result.first()
+
+    async def touch_books(self, session:AsyncSession, *criteria):
+        """Bump updated_at of the matching books so their ETag and cached detail change.
+        Runs in the caller's transaction, which must commit."""
+        await session.exec(update(Book).where(*criteria).values(updated_at=datetime.now()))
+
+    async def record_rating(self, session:AsyncSession, book_uid, rating:int, delta:int):
+        """Add (delta=1) or remove (delta=-1) a review's rating from the book's aggregates
+        and bump updated_at like touch_books. Runs in the caller's transaction, which must commit."""
+        await session.exec(
+            update(Book).where(Book.uid==book_uid).values(**rating_change(rating, delta), updated_at=datetime.now())
+        )
+
+    async def get_book_reviews(self, book_uid, session:AsyncSession, limit:int=DEFAULT_PAGE_SIZE,
+                               cursor:Optional[str]=None, sort:str=DEFAULT_REVIEW_SORT):
+        statement = book_reviews_statement(book_uid, sort, cursor, limit)
+        result = await session.exec(statement)
+        return build_page(result.all(), limit, review_sort_key(sort))
+
+    async def get_book_detail_json(self, book_uid:str, etag:str, session:AsyncSession) -> Optional[bytes]:
+        """BookDetail of a book as JSON, served from the response cache"""
+        async def load_book_detail():
+            book = await self.get_book(book_uid,session,options=BOOK_DETAIL)
+            if not book:
+                return None
+            reviews = await self.get_book_reviews(book.uid,session)
+            fields = {name: getattr(book, name) for name in BookDetail.model_fields if name != "reviews"}
+            detail = BookDetail.model_validate({**fields, "reviews": reviews}, from_attributes=True)
+            return detail.model_dump_json().encode()
+
+        return await response_cache.get_or_load(book_detail_key(book_uid, etag), load_book_detail)
+
     async def create_book(self, book_data:BookCreateModel, user_uid:str, session:AsyncSession):
         book_data_dict = book_data.model_dump()
         new_book = Book(
@@ -45,9 +134,12 @@ class BookService:
         return book_to_update
 
     async def delete_book(self, book_uid:str, session:AsyncSession):
-        book_to_delete = await self.get_book(book_uid,session)
-        if not book_to_delete:
-            return None
-        await session.delete(book_to_delete)
-        await session.commit() 
-        return book_to_delete
\ No newline at end of file
+        """Delete a book and its tag links, keeping its reviews detached like the ORM did.
+        Three statements whatever the number of reviews and tags, nothing is loaded.
+        Returns the uid of the deleted book, None if it does not exist."""
+        await session.exec(update(Review).where(Review.book_uid==book_uid).values(book_uid=None))
+        await session.exec(delete(BookTag).where(BookTag.book_id==book_uid))
+        result = await session.exec(delete(Book).where(Book.uid==book_uid).returning(Book.uid))
+        deleted = result.scalar_one_or_none()
+        await session.commit()
+        return deleted
\ No newline at end of file
@@ -1,14 +1,117 @@
+import logging
+from typing import Optional
 from celery import Celery
-from asgiref.sync import async_to_sync
-from src.mail import mail
-from src.mail import create_message
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from src.books.ratings import reconcile_ratings
+from src.config import Config
+from src.db.main import async_engine, async_session_maker
+from src.db.redis import close_redis
+from src.mail import smtp_client, deliver_bulk, build_message, email_templates
+from src.worker_loop import worker_loop, async_task
+logger = logging.getLogger("bookly.tasks")
 c_app = Celery()
 c_app.config_from_object(
     'src.config'
 )
 
-@c_app.task()
-def send_email(recipients: list[str], subject: str, body: str):
-    message = create_message(recipients=recipients, subject=subject, body=body)
-    async_to_sync(mail.send_message)(message)
-    print("Email sent")
+
+@worker_loop.on_shutdown
+async def close_clients():
+    await smtp_client.close()
+    await close_redis()
+    await async_engine.dispose()
+
+
+# only in prefork children: a loop thread started in the parent wouldn't
+# survive the fork. Solo and threads pools start the loop with their first task.
+@worker_process_init.connect
+def start_worker_loop(**kwargs):
+    email_templates.load()
+    worker_loop.start()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def stop_worker_loop(**kwargs):
+    worker_loop.stop()
+
+
+@async_task(c_app)
+async def send_email(recipients: list[str], subject: str, body: str):
+    message = build_message(", ".join(recipients), subject, body)
+    await smtp_client.send(message)
+    logger.info("email sent to %d recipients", len(recipients))
+
+
+def deliver_with_retry(task, recipients: list[str], subject: str, body, retry_args):
+    """
+    Send to each recipient separately over the worker's SMTP connection.
+    Recipients failing with a transient error are retried on their own,
+    retry_args builds the task arguments for them.
+
+    Runs on the task's thread, only the delivery goes to the worker loop:
+    Celery keeps the request of a task in a thread local, so its id and
+    retries can't be read, nor a retry requested, from the loop.
+    """
+    report = worker_loop.run(
+        deliver_bulk(
+            smtp_client,
+            recipients,
+            subject,
+            body,
+            batch_size=Config.MAIL_BATCH_SIZE,
+            rate_per_second=Config.MAIL_RATE_PER_SECOND,
+            rate_per_domain=Config.MAIL_RATE_PER_DOMAIN,
+        )
+    )
+    logger.info(
+        "%s %s: sent %d/%d in %d batches, %.3fs, %.2f msg/s, "
+        "%d rejected, %d deferred",
+        task.name,
+        task.request.id,
+        len(report.sent),
+        len(recipients),
+        report.batches,
+        report.elapsed,
+        report.throughput,
+        len(report.rejected),
+        len(report.deferred),
+    )
+
+    if report.deferred and task.request.retries < task.max_retries:
+        raise task.retry(
+            args=retry_args(list(report.deferred)),
+            countdown=Config.MAIL_RETRY_DELAY * (2 ** task.request.retries),
+        )
+    return report.as_dict()
+
+
+@c_app.task(bind=True, max_retries=Config.MAIL_MAX_RETRIES)
+def send_bulk_email(self, recipients: list[str], subject: str, body: str):
+    return deliver_with_retry(
+        self, recipients, subject, body,
+        retry_args=lambda deferred: [deferred, subject, body],
+    )
+
+
+@c_app.task(bind=True, max_retries=Config.MAIL_MAX_RETRIES)
+def send_template_email(self, recipients: list[str], template_name: str, context: dict):
+    """
+    Render template_name for each recipient in the worker and send it.
+    The recipient's address is available to the template as `email`.
+    """
+    subject = email_templates.subject(template_name)
+    return deliver_with_retry(
+        self, recipients, subject,
+        lambda recipient: email_templates.render(template_name, {**context, "email": recipient}),
+        retry_args=lambda deferred: [deferred, template_name, context],
+    )
+
+
+@async_task(c_app)
+async def reconcile_book_ratings(book_uid: Optional[str] = None):
+    """Recompute the rating aggregates of one book or of all books from their reviews"""
+    async with async_session_maker() as session:
+        fixed = await reconcile_ratings(session, book_uid)
+    logger.info("rating aggregates reconciled, %d books corrected", fixed)
+    return fixed
@@ -2,9 +2,37 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    QUERY_BUDGET: int = 20
+    QUERY_BUDGET_MODE: str = "off"
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL: float = 60
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: float = 30
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 5
+    SEARCH_SIMILARITY_THRESHOLD: float = 0.4
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5
+    REDIS_SOCKET_TIMEOUT: float = 5
+    REDIS_CONNECT_TIMEOUT: float = 2
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    RESPONSE_CACHE_TTL: int = 300
+    RESPONSE_CACHE_LOCK_TTL: float = 5
+    RESPONSE_CACHE_LOCK_WAIT: float = 2
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_FALLBACK_SIZE: int = 10000
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
     MAIL_FROM: str
@@ -15,6 +43,11 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool = False
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    MAIL_BATCH_SIZE: int = 100
+    MAIL_RATE_PER_SECOND: float = 10
+    MAIL_RATE_PER_DOMAIN: float = 2
+    MAIL_MAX_RETRIES: int = 3
+    MAIL_RETRY_DELAY: int = 60
     DOMAIN: str
     
     model_config = SettingsConfigDict(
@@ -1,3 +1,10 @@
 ADMIN_ROLE = 'admin'
 USER_ROLE = 'user'
-ALLOWED_ROLES = [USER_ROLE,ADMIN_ROLE]
\ No newline at end of file
+ALLOWED_ROLES = [USER_ROLE,ADMIN_ROLE]
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+IMPORT_CHUNK_SIZE = 1000
+MAX_IMPORT_ERRORS = 1000
+# characters a CSV record may span while a quoted value is open
+MAX_CSV_RECORD_SIZE = 16 * 1024
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from redis.exceptions import LockError, RedisError
+
+from src.config import Config
+from src.db.redis import redis_client
+from src.metrics import RESPONSE_CACHE_REQUESTS
+
+logger = logging.getLogger("bookly.cache")
+
+CACHE_PREFIX = "bookly:cache:"
+LOCK_POLL_INTERVAL = 0.05
+
+Loader = Callable[[], Awaitable[Optional[bytes]]]
+
+# outcome shared with waiters when the caller loading a key was cancelled
+LOAD_CANCELLED = object()
+
+
+class ResponseCache:
+    """
+    Read-through cache of pre-serialized JSON responses stored in Redis.
+
+    Concurrent misses on one key run the loader once: callers in the same
+    process await a shared future, and across processes a short Redis lock
+    lets one worker load while the others poll for its result. Redis errors
+    are logged and treated as misses so the database stays the fallback.
+    A loader belongs to its caller, e.g. reads through the request's
+    session, so when that caller is cancelled the waiters don't inherit
+    the cancellation: one of them loads with its own loader instead.
+    """
+
+    def __init__(self, ttl: int, lock_ttl: float, lock_wait: float) -> None:
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
+
+    def _count(self, result: str) -> None:
+        setattr(self, result, getattr(self, result) + 1)
+        RESPONSE_CACHE_REQUESTS.labels(result).inc()
+
+    async def get_or_load(self, key: str, loader: Loader) -> Optional[bytes]:
+        """Return the cached value for key, loading and storing it on a miss.
+        A loader returning None is not cached."""
+        cached = await self._get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._count("coalesced")
+            value = await asyncio.shield(inflight)
+            if value is LOAD_CANCELLED:
+                return await self.get_or_load(key, loader)
+            return value
+
+        self._count("misses")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, loader)
+        except asyncio.CancelledError:
+            future.set_result(LOAD_CANCELLED)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # only waiters need the exception, don't log it as unretrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def get_or_load_current(self, key: str, loader: Loader) -> Optional[bytes]:
+        """
+        get_or_load for a key without a version of its own, like a listing.
+        The value is stored under the key's current generation, which writers
+        move on with new_generation once they committed. A load that read the
+        rows before such a commit can only fill the previous generation, which
+        nobody reads anymore, where deleting the key would let it put the
+        stale value back for the whole TTL.
+        """
+        try:
+            generation = int(await redis_client.get(f"{key}:generation") or 0)
+        except RedisError as e:
+            self._count("errors")
+            logger.warning("response cache generation read failed for %s: %s", key, e)
+            return await loader()
+        return await self.get_or_load(f"{key}:{generation}", loader)
+
+    async def new_generation(self, key: str) -> None:
+        """Make get_or_load_current(key) miss the values stored until now"""
+        try:
+            await redis_client.incr(f"{key}:generation")
+        except RedisError as e:
+            self._count("errors")
+            logger.warning("response cache invalidation failed for %s: %s", key, e)
+
+    async def _load(self, key: str, loader: Loader) -> Optional[bytes]:
+        lock = redis_client.lock(f"{key}:lock", timeout=self.lock_ttl)
+        try:
+            locked = await lock.acquire(blocking=False)
+        except RedisError as e:
+            self._count("errors")
+            logger.warning("response cache lock failed for %s: %s", key, e)
+            return await loader()
+
+        if not locked:
+            # another process is loading this key, give it a moment
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                cached = await self._get(key)
+                if cached is not None:
+                    return cached
+            return await loader()
+
+        try:
+            value = await loader()
+            if value is not None:
+                await self._set(key, value)
+            return value
+        finally:
+            try:
+                await lock.release()
+            except (LockError, RedisError):
+                # expired while loading, the key is no longer ours to release
+                pass
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        try:
+            return await redis_client.get(key)
+        except RedisError as e:
+            self._count("errors")
+            logger.warning("response cache read failed for %s: %s", key, e)
+            return None
+
+    async def _set(self, key: str, value: bytes) -> None:
+        try:
+            await redis_client.set(key, value, ex=self.ttl)
+        except RedisError as e:
+            self._count("errors")
+            logger.warning("response cache write failed for %s: %s", key, e)
+
+
+response_cache = ResponseCache(
+    ttl=Config.RESPONSE_CACHE_TTL,
+    lock_ttl=Config.RESPONSE_CACHE_LOCK_TTL,
+    lock_wait=Config.RESPONSE_CACHE_LOCK_WAIT,
+)
+
+
+def book_detail_key(book_uid, etag: str) -> str:
+    """
+    Key of a BookDetail representation.
+    Including the ETag means a change to the book never needs an explicit
+    invalidation, superseded entries just expire.
+    """
+    # the same book can be requested as str or UUID, in any letter case
+    try:
+        book_uid = uuid.UUID(str(book_uid))
+    except ValueError:
+        pass
+    return f"{CACHE_PREFIX}book:{book_uid}:{etag.strip(chr(34))}"
+
+
+TAGS_KEY = f"{CACHE_PREFIX}tags"
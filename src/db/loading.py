@@ -0,0 +1,23 @@
+"""Loader option profiles for ORM queries.
+
+Relationships on the models are declared lazy="raise_on_sql", so a query
+loads nothing beyond columns unless it asks for it with one of these
+profiles. Pick the profile matching what the response model serializes.
+"""
+from sqlalchemy.orm import selectinload
+
+from src.db.models import Book, Tag, User
+
+# columns only, used by list endpoints returning the `Book` schema
+BOOK_SUMMARY = ()
+
+# what `BookDetail` serializes besides its first page of reviews, which is
+# queried separately so a popular book never loads all of them
+BOOK_DETAIL = (selectinload(Book.tags),)
+
+TAG_SUMMARY = ()
+
+USER_SUMMARY = ()
+
+# everything `UserBooksModel` serializes
+USER_LIBRARY = (selectinload(User.books), selectinload(User.reviews))
@@ -1,15 +1,38 @@
-from sqlmodel import create_engine,text, SQLModel
-from sqlalchemy.ext.asyncio import AsyncEngine
-from src.db.models import Book #this import is important 
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from src.db.models import Book #this import is important
 from src.config import Config
+from src.db.pool_stats import TimedAsyncQueuePool, instrument_pool
+from src.db.query_stats import instrument_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import sessionmaker
 
-async_engine = AsyncEngine(
-    create_engine(
+
+def _connect_args() -> dict:
+    if not Config.DB_STATEMENT_TIMEOUT_MS:
+        return {}
+    # asyncpg applies server_settings on every new connection
+    return {"server_settings": {"statement_timeout": str(Config.DB_STATEMENT_TIMEOUT_MS)}}
+
+
+async_engine = create_async_engine(
     url=Config.DATABASE_URL,
-    echo=False
-))
+    echo=Config.DB_ECHO,
+    poolclass=TimedAsyncQueuePool,
+    pool_size=Config.DB_POOL_SIZE,
+    max_overflow=Config.DB_MAX_OVERFLOW,
+    pool_timeout=Config.DB_POOL_TIMEOUT,
+    pool_recycle=Config.DB_POOL_RECYCLE,
+    pool_pre_ping=Config.DB_POOL_PRE_PING,
+    connect_args=_connect_args(),
+)
+
+instrument_engine(async_engine.sync_engine)
+instrument_pool(async_engine.sync_engine)
+
+
+async_session_maker = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 async def init_db():
     async with async_engine.begin() as conn:
@@ -17,9 +40,5 @@ async def init_db():
 
 async def get_session() -> AsyncSession:
     """Dependency to provide the session object"""
-    async_session = sessionmaker(
-        bind=async_engine, class_=AsyncSession, expire_on_commit=False
-    )
-
-    async with async_session() as session:
-        yield session
\ No newline at end of file
+    async with async_session_maker() as session:
+        yield session
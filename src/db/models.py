@@ -1,6 +1,7 @@
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlmodel import Relationship, SQLModel, Field, Column
+from sqlalchemy import Computed, Index, UniqueConstraint
 import sqlalchemy.dialects.postgresql as pg
 import uuid
 
@@ -8,6 +9,7 @@ from src.constants import USER_ROLE
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (UniqueConstraint("email", name="uq_users_email"),)
 
     uid: uuid.UUID = Field(
         sa_column=Column(
@@ -30,20 +32,23 @@ class User(SQLModel, table=True):
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now()))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now()))
     books: List["Book"] = Relationship(back_populates="user",
-                                              sa_relationship_kwargs={"lazy":"selectin"})
+                                              sa_relationship_kwargs={"lazy": "raise_on_sql"})
     reviews: List["Review"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     
     def __repr__(self) -> str:
         return f"<User {self.username}>"
     
 class BookTag(SQLModel, table=True):
+    # the primary key leads with book_id, this one finds the books of a tag
+    __table_args__ = (Index("ix_booktag_tag_id_book_id", "tag_id", "book_id"),)
     book_id: uuid.UUID = Field(default=None, foreign_key="books.uid", primary_key=True)
     tag_id: uuid.UUID = Field(default=None, foreign_key="tags.uid", primary_key=True) 
 
 class Tag(SQLModel, table=True):
     __tablename__ = "tags"
+    __table_args__ = (UniqueConstraint("name", name="uq_tags_name"),)
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
     )
@@ -52,7 +57,7 @@ class Tag(SQLModel, table=True):
     books: List["Book"] = Relationship(
         link_model=BookTag,
         back_populates="tags",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise_on_sql"},
     )
 
     def __repr__(self) -> str:
@@ -60,6 +65,22 @@ class Tag(SQLModel, table=True):
     
 class Book(SQLModel, table=True):
     __tablename__ = "books"
+    # trailing uid matches the (sort column, uid) keysets used for pagination,
+    # see BOOK_LIST_INDEXES in src/books/query.py for the queries each one serves
+    __table_args__ = (
+        Index("ix_books_created_at_uid", "created_at", "uid"),
+        Index("ix_books_published_date_uid", "published_date", "uid"),
+        Index("ix_books_title_uid", "title", "uid"),
+        Index("ix_books_page_count_uid", "page_count", "uid"),
+        Index("ix_books_average_rating_uid", "average_rating", "uid"),
+        Index("ix_books_review_count_uid", "review_count", "uid"),
+        Index("ix_books_user_uid_created_at_uid", "user_uid", "created_at", "uid"),
+        Index("ix_books_language_created_at_uid", "language", "created_at", "uid"),
+        Index("ix_books_language_title_uid", "language", "title", "uid"),
+        Index("ix_books_author_published_date_uid", "author", "published_date", "uid"),
+        Index("ix_books_author_title_uid", "author", "title", "uid"),
+        Index("ix_books_publisher_published_date_uid", "publisher", "published_date", "uid"),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(
@@ -76,27 +97,73 @@ class Book(SQLModel, table=True):
     page_count: int
     language: str
     user_uid: Optional[uuid.UUID] = Field(default=None,foreign_key="users.uid")
-    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP,default=datetime.now()))
-    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP,default=datetime.now()))
+    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP,default=datetime.now))
+    # rating aggregates of the book's reviews, kept current by BookService.record_rating
+    # and repaired by src.books.ratings.reconcile_ratings
+    review_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_sum: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_1: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_2: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_3: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_4: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_5: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # rating_sum / review_count, 0 without reviews; stored so it can be indexed
+    average_rating: float = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # bumped by every change visible in BookDetail, see BookService.touch_books
+    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP,default=datetime.now,onupdate=datetime.now))
     user: Optional[User] = Relationship(back_populates="books")
     reviews: List["Review"] = Relationship(
-        back_populates="book", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="book", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     tags: List[Tag] = Relationship(
         link_model=BookTag,
         back_populates="books",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise_on_sql"},
     )
     
+    @property
+    def rating_histogram(self) -> Dict[int, int]:
+        return {rating: getattr(self, f"rating_{rating}") for rating in range(1, 6)}
+
     def __repr__(self):
         return f"<Book {self.title}>"
     
+# Full-text search document of a book, title weighted over author over publisher.
+# Appended to the table rather than declared as a field so the ORM never loads it.
+BOOK_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(publisher, '')), 'C')"
+)
+
+Book.__table__.append_column(
+    Column("search_vector", pg.TSVECTOR, Computed(BOOK_SEARCH_DOCUMENT, persisted=True))
+)
+Book.__table__.append_constraint(
+    Index("ix_books_search_vector", Book.__table__.c.search_vector, postgresql_using="gin")
+)
+# trigram indexes for typo tolerant matching, need the pg_trgm extension
+Book.__table__.append_constraint(
+    Index("ix_books_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"})
+)
+Book.__table__.append_constraint(
+    Index("ix_books_author_trgm", "author", postgresql_using="gin", postgresql_ops={"author": "gin_trgm_ops"})
+)
+
 class Review(SQLModel, table=True):
     __tablename__ = "reviews"
+    # the sort orders and admin filters of review listings, see src/reviews/query.py
+    __table_args__ = (
+        Index("ix_reviews_created_at_uid", "created_at", "uid"),
+        Index("ix_reviews_user_uid_created_at_uid", "user_uid", "created_at", "uid"),
+        Index("ix_reviews_rating_created_at_uid", "rating", "created_at", "uid"),
+        Index("ix_reviews_book_uid_created_at_uid", "book_uid", "created_at", "uid"),
+        Index("ix_reviews_book_uid_rating_created_at_uid", "book_uid", "rating", "created_at", "uid"),
+    )
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
     )
-    rating: int = Field(le=5)
+    rating: int = Field(ge=1, le=5)
     review_text: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
     book_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="books.uid")
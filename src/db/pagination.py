@@ -0,0 +1,94 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any, Callable, Optional, Sequence
+
+from sqlalchemy import asc, desc, tuple_
+
+from src.errors import InvalidCursor
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"u": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "u" in value:
+            return uuid.UUID(value["u"])
+        raise ValueError("Unknown cursor value")
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row of a page into an opaque cursor"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor produced by encode_cursor, raising InvalidCursor if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("Cursor does not match the sort key")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor()
+
+
+def keyset(statement, columns: Sequence[Any], cursor: Optional[str], descending: bool = True):
+    """Order a select statement by `columns`, starting after the row `cursor` points at.
+
+    The last column must be unique (usually the primary key) so that the
+    ordering is total.
+    """
+    values = decode_cursor(cursor, len(columns)) if cursor else None
+    return keyset_after(statement, columns, values, descending)
+
+
+def keyset_after(statement, columns: Sequence[Any], values: Optional[Sequence[Any]], descending: bool = True):
+    """keyset() with the cursor already decoded, for callers validating its values"""
+    if values:
+        if descending:
+            statement = statement.where(tuple_(*columns) < tuple_(*values))
+        else:
+            statement = statement.where(tuple_(*columns) > tuple_(*values))
+
+    direction = desc if descending else asc
+    return statement.order_by(*[direction(c) for c in columns])
+
+
+def paginate(
+    statement,
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+):
+    """Apply keyset pagination on `columns` to a select statement.
+    One extra row is fetched to know whether another page exists.
+    """
+    return keyset(statement, columns, cursor, descending).limit(limit + 1)
+
+
+def build_page(rows: Sequence[Any], limit: int, key: Callable[[Any], Sequence[Any]]) -> dict:
+    """Trim the extra row fetched by paginate and compute the next cursor"""
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(key(items[-1]))
+    return {"items": items, "next_cursor": next_cursor}
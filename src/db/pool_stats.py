@@ -0,0 +1,68 @@
+"""
+Connection pool metrics, exported on /metrics.
+
+instrument_pool() keeps the checked out and overflow gauges current from the
+pool's checkout and checkin events and counts the connections it opens. How
+long a checkout waits is timed around Pool.connect() by TimedCheckout, mixed
+into the pool class. The time includes opening a new connection when the
+pool is below its size, so a high wait with few connections checked out and
+a climbing opened count points to slow connects rather than an undersized
+pool.
+"""
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CONNECTIONS_OPENED,
+    DB_POOL_OVERFLOW,
+    DB_POOL_WAIT,
+)
+
+
+class TimedCheckout:
+    """Pool mixin observing the duration of every checkout in DB_POOL_WAIT"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
+class TimedAsyncQueuePool(TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(engine: Engine) -> None:
+    """Attach the pool gauges to a (sync) engine, for async engines pass .sync_engine"""
+
+    checked_out = 0
+
+    def update_overflow():
+        # counted here: on checkin the pool only settles its own overflow
+        # count after the event. Read the size through the engine, dispose()
+        # replaces its pool.
+        DB_POOL_OVERFLOW.set(max(checked_out - engine.pool.size(), 0))
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS_OPENED.inc()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        nonlocal checked_out
+        checked_out += 1
+        DB_POOL_CHECKED_OUT.inc()
+        update_overflow()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        nonlocal checked_out
+        checked_out -= 1
+        DB_POOL_CHECKED_OUT.dec()
+        update_overflow()
@@ -0,0 +1,97 @@
+"""
+Counts the SQL statements, rows and database time of a unit of work.
+
+The engine hooks add every statement to the QueryStats of the current
+context, so wrapping a request (or a test) in track_queries() tells how many
+statements it issued. A budget catches N+1 queries: in "warn" mode going
+over it is logged, in "fail" mode the statement that goes over raises
+QueryBudgetExceeded.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.errors import QueryBudgetExceeded
+
+BUDGET_MODES = ("off", "warn", "fail")
+
+logger = logging.getLogger("bookly.queries")
+
+
+@dataclass
+class QueryStats:
+    budget: Optional[int] = None
+    mode: str = "off"
+    statements: int = 0
+    rows: int = 0
+    duration: float = 0.0
+    # statements kept once the budget is exceeded, to show what repeats
+    over_budget: List[str] = field(default_factory=list)
+
+    @property
+    def exceeded(self) -> bool:
+        return self.budget is not None and self.statements > self.budget
+
+    def record(self, statement: str, rows: int, duration: float) -> None:
+        self.statements += 1
+        self.rows += max(rows, 0)
+        self.duration += duration
+        if self.mode == "off" or not self.exceeded:
+            return
+        self.over_budget.append(statement)
+        if self.mode == "fail":
+            raise QueryBudgetExceeded(
+                f"{self.statements} statements issued, the budget is {self.budget}: {statement}"
+            )
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.statements} queries, {self.rows} rows"'
+
+
+# shared by reference, so statements run in child tasks count towards the parent
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(budget: Optional[int] = None, mode: str = "off") -> Iterator[QueryStats]:
+    if mode not in BUDGET_MODES:
+        raise ValueError(f"query budget mode must be one of {BUDGET_MODES}, not {mode!r}")
+    stats = QueryStats(budget=budget, mode=mode)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        if mode != "off" and stats.exceeded:
+            logger.warning(
+                "query budget exceeded: %d statements, budget %d",
+                stats.statements,
+                stats.budget,
+                extra={"over_budget": stats.over_budget},
+            )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # on the statement's own context, which is dropped with it when the
+    # statement fails and after_cursor_execute never fires
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_start
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, cursor.rowcount, duration)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach the statement hooks to a (sync) engine, for async engines pass .sync_engine"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
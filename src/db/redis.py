@@ -1,17 +1,185 @@
+"""
+The process' Redis connections.
+
+Token revocation, the response cache and rate limiting all go through
+`redis_client`, which draws from one explicitly sized pool: a command
+waits up to REDIS_POOL_TIMEOUT for a free connection instead of opening
+more, and idle connections are health checked before reuse. The auth
+invalidation listener holds one connection of the pool for as long as it
+runs. The lifespan opens the pool with init_redis and closes it with
+close_redis; Celery workers close it on shutdown.
+
+Commands a request needs together go out in one round trip through
+`pipeline()`. Single-key reads from concurrent requests, like blocklist
+checks, are coalesced into one MGET by a KeyBatcher.
+"""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
 from redis import asyncio as aioredis3
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
 from src.config import Config
 
+logger = logging.getLogger("bookly.redis")
+
 JTI_EXPIRE =3600
+AUTH_INVALIDATION_CHANNEL = "bookly:auth-invalidation"
+RESUBSCRIBE_DELAY = 1
+# how long the invalidation listener waits for a message before checking
+# the connection again, kept under the socket timeout
+LISTEN_POLL_INTERVAL = 1
+MAX_BATCH_SIZE = 500
+
+redis_pool = aioredis3.BlockingConnectionPool.from_url(
+    Config.REDIS_URL,
+    max_connections=Config.REDIS_MAX_CONNECTIONS,
+    timeout=Config.REDIS_POOL_TIMEOUT,
+    socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+    health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+)
+
+redis_client = aioredis3.Redis(connection_pool=redis_pool)
+
+
+async def init_redis() -> None:
+    """Open a first connection so a misconfigured Redis shows up at startup.
+    Not fatal: every user of Redis degrades while it is unreachable."""
+    try:
+        await redis_client.ping()
+    except RedisError as e:
+        logger.warning("redis is unreachable at startup: %s", e)
+
+
+async def close_redis() -> None:
+    await redis_client.aclose()
+    # a client given a pool leaves it open
+    await redis_pool.disconnect()
+
+
+@asynccontextmanager
+async def pipeline(transaction: bool = False) -> AsyncIterator[Pipeline]:
+    """
+    Queue commands on the yielded pipeline and send them in one round trip
+    with `await pipe.execute()`. Without a transaction the commands still
+    run in order but other clients' commands may interleave.
+    """
+    async with redis_client.pipeline(transaction=transaction) as pipe:
+        yield pipe
+
+
+class KeyBatcher:
+    """
+    Coalesces GETs of single keys made concurrently on the event loop into
+    one MGET. Lookups issued in the same loop iteration share a round trip,
+    later ones go out with the next batch, so a batch never waits on a timer.
+    """
+
+    def __init__(self, client: aioredis3.Redis, max_batch_size: int = MAX_BATCH_SIZE) -> None:
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_scheduled = False
+        self._sending: Set[asyncio.Task] = set()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append(future)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            # runs once the callbacks already scheduled, i.e. other requests
+            # of this iteration, had their chance to queue a key
+            loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._send(pending))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, pending: Dict[str, List[asyncio.Future]]) -> None:
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = keys[start:start + self.max_batch_size]
+            try:
+                values = await self.client.mget(batch)
+            except Exception as e:
+                for key in batch:
+                    self._resolve(pending[key], exception=e)
+            else:
+                for key, value in zip(batch, values):
+                    self._resolve(pending[key], value=value)
+
+    @staticmethod
+    def _resolve(futures: List[asyncio.Future], value=None, exception=None) -> None:
+        for future in futures:
+            # the caller may have been cancelled meanwhile
+            if future.done():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(value)
+
+
+blocklist_lookups = KeyBatcher(redis_client)
 
-token_blocklist = aioredis3.from_url(url=Config.REDIS_URL)
 
 async def add_jti_to_blocklist(jti: str) -> None:
-    await token_blocklist.set(
-        name=jti,
-        value="",
-        ex=JTI_EXPIRE
-    )
+    async with pipeline() as pipe:
+        pipe.set(name=jti, value="", ex=JTI_EXPIRE)
+        pipe.publish(AUTH_INVALIDATION_CHANNEL, invalidation_message("jti", jti))
+        await pipe.execute()
 
 async def token_in_blocklist(jti:str)->bool:
-    jti = await token_blocklist.get(jti)
-    return jti is not None
\ No newline at end of file
+    jti = await blocklist_lookups.get(jti)
+    return jti is not None
+
+def invalidation_message(kind: str, key: str) -> str:
+    return json.dumps({"kind": kind, "key": key})
+
+def parse_invalidation(data) -> Optional[Tuple[str, Optional[str]]]:
+    """(kind, key) of a published invalidation, None for a malformed one,
+    which is logged and skipped so it can't stop the listener"""
+    try:
+        message = json.loads(data)
+        return message["kind"], message["key"]
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning("ignoring malformed auth invalidation %r: %s", data, e)
+        return None
+
+async def publish_auth_invalidation(kind: str, key: str) -> None:
+    """Tell every worker to drop cached auth state for `key`"""
+    await redis_client.publish(AUTH_INVALIDATION_CHANNEL, invalidation_message(kind, key))
+
+async def listen_for_auth_invalidations(handler: Callable[[str, Optional[str]], None]) -> None:
+    """
+    Call handler(kind, key) for every invalidation published by any worker.
+    Messages sent while disconnected are lost, so handler("reset", None) is
+    called on each (re)subscription to let callers drop everything they cached.
+    Runs until cancelled.
+    """
+    while True:
+        try:
+            async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(AUTH_INVALIDATION_CHANNEL)
+                handler("reset", None)
+                while True:
+                    # polled rather than listen(), which would hit the socket
+                    # timeout whenever the channel is quiet for that long
+                    message = await pubsub.get_message(timeout=LISTEN_POLL_INTERVAL)
+                    if message is None or message["type"] != "message":
+                        continue
+                    invalidation = parse_invalidation(message["data"])
+                    if invalidation is not None:
+                        handler(*invalidation)
+        except (RedisError, OSError) as e:
+            logger.warning("auth invalidation listener disconnected: %s", e)
+            handler("reset", None)
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
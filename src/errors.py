@@ -1,3 +1,4 @@
+import logging
 from typing import Any, Callable
 from fastapi.requests import Request
 from fastapi.responses import JSONResponse
@@ -76,6 +77,39 @@ class UserNotFound(BooklyException):
     pass
 
 
+class ServerBusy(BooklyException):
+    """Server is at capacity for an expensive operation and cannot queue more work"""
+
+    pass
+
+
+class InvalidCursor(BooklyException):
+    """User has provided a malformed pagination cursor"""
+
+    pass
+
+
+class UnsupportedBookQuery(BooklyException):
+    """User has asked for a combination of book filters and sort that no index serves"""
+
+    pass
+
+
+class QueryBudgetExceeded(BooklyException):
+    """A request issued more SQL statements than the configured budget allows"""
+
+    pass
+
+
+class RateLimitExceeded(BooklyException):
+    """User has sent more requests than a rate limit allows"""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__()
+        # seconds until the request would be accepted
+        self.retry_after = retry_after
+
+
 class AccountNotVerified(Exception):
     """Account not yet verified"""
     pass
@@ -89,8 +123,12 @@ def create_exception_handler(
 ) -> Callable[[Request, Exception], JSONResponse]:
 
     async def exception_handler(request: Request, exc: BooklyException):
+        content = initial_detail
+        # errors raised with a message explain what exactly was wrong
+        if exc.args:
+            content = {**initial_detail, "detail": str(exc)}
 
-        return JSONResponse(content=initial_detail, status_code=status_code)
+        return JSONResponse(content=content, status_code=status_code)
 
     return exception_handler
 
@@ -221,6 +259,54 @@ def register_all_errors(app: FastAPI):
         ),
     )
 
+    app.add_exception_handler(
+        ServerBusy,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "Server is busy",
+                "resolution": "Please try again shortly",
+                "error_code": "server_busy",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        UnsupportedBookQuery,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "This combination of filters and sort is not supported",
+                "resolution": "Use at most one of user_uid, language, author, publisher or tag, with a sort listed for it",
+                "error_code": "unsupported_book_query",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        QueryBudgetExceeded,
+        create_exception_handler(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            initial_detail={
+                "message": "Request went over its SQL statement budget",
+                "resolution": "Load the data in fewer queries",
+                "error_code": "query_budget_exceeded",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        InvalidCursor,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Invalid pagination cursor",
+                "resolution": "Please restart from the first page",
+                "error_code": "invalid_cursor",
+            },
+        ),
+    )
+
     app.add_exception_handler(
         AccountNotVerified,
         create_exception_handler(
@@ -244,6 +330,18 @@ def register_all_errors(app: FastAPI):
         ),
     )
 
+    @app.exception_handler(RateLimitExceeded)
+    async def rate_limit_exceeded(request, exc: RateLimitExceeded):
+        return JSONResponse(
+            content={
+                "message": "Too many requests",
+                "resolution": f"Please try again in {exc.retry_after} seconds",
+                "error_code": "rate_limited",
+            },
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
     @app.exception_handler(500)
     async def internal_server_error(request, exc):
 
@@ -258,7 +356,7 @@ def register_all_errors(app: FastAPI):
 
     @app.exception_handler(SQLAlchemyError)
     async def database__error(request, exc):
-        print(str(exc))
+        logging.getLogger("bookly.errors").error("database error: %s", exc)
         return JSONResponse(
             content={
                 "message": "Oops! Something went wrong",
@@ -0,0 +1,25 @@
+import hashlib
+from fastapi import Request, Response, status
+
+# bump when a response shape changes so clients drop representations they hold
+ETAG_VERSION = "2"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag derived from the values identifying a representation"""
+    digest = hashlib.blake2b(repr((ETAG_VERSION, *parts)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match lists etag, using the weak comparison RFC 9110 asks for"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,75 @@
+"""
+Structured logging that stays off the request path.
+
+Records are put on an in-memory queue by a QueueHandler and a QueueListener
+thread formats them as JSON and writes them out, so a slow stdout never
+blocks the event loop.
+"""
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# attributes every LogRecord has, anything else was passed through `extra`
+RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items() if key not in RESERVED_ATTRS
+        )
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LocalQueueHandler(QueueHandler):
+    """Enqueue records as they are, formatting happens on the listener thread.
+    The queue never leaves the process so nothing has to be made picklable."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def start_logging(level: int = logging.INFO) -> None:
+    """Route the `bookly` loggers through the queue, idempotent"""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter())
+
+    logger = logging.getLogger("bookly")
+    logger.setLevel(level)
+    logger.addHandler(LocalQueueHandler(log_queue))
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    logger = logging.getLogger("bookly")
+    for handler in [h for h in logger.handlers if isinstance(h, QueueHandler)]:
+        logger.removeHandler(handler)
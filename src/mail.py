@@ -1,3 +1,11 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Callable, Dict, List, Optional, Union
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
 from fastapi_mail import FastMail, ConnectionConfig, MessageSchema, MessageType
 from src.config import Config
 from pathlib import Path
@@ -5,6 +13,7 @@ from pathlib import Path
 
 # get the parent directory
 BASE_DIR = Path(__file__).resolve().parent
+TEMPLATE_FOLDER = Path(BASE_DIR, "templates")
 
 
 # create the config for sending emails
@@ -19,7 +28,7 @@ mail_config = ConnectionConfig(
     MAIL_SSL_TLS=False,
     USE_CREDENTIALS=True,
     VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(BASE_DIR, "templates"),
+    TEMPLATE_FOLDER=TEMPLATE_FOLDER,
 )
 
 
@@ -30,4 +39,211 @@ def create_message(recipients: list[str], subject: str, body: str):
     message = MessageSchema(
         recipients=recipients, subject=subject, body=body, subtype=MessageType.html
     )
-    return message
\ No newline at end of file
+    return message
+
+class SMTPClient:
+    """
+    A persistent SMTP connection, reopened when the server drops it.
+    Keep one per worker process and use it from a single event loop.
+    Concurrent senders take turns, an SMTP transaction can't be interleaved.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        start_tls: Optional[bool] = None,
+        validate_certs: bool = True,
+    ) -> None:
+        self._options = dict(
+            hostname=hostname,
+            port=port,
+            username=username,
+            password=password,
+            use_tls=use_tls,
+            start_tls=start_tls,
+            validate_certs=validate_certs,
+        )
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_config(cls) -> "SMTPClient":
+        return cls(
+            hostname=Config.MAIL_SERVER,
+            port=Config.MAIL_PORT,
+            username=Config.MAIL_USERNAME if Config.USE_CREDENTIALS else None,
+            password=Config.MAIL_PASSWORD if Config.USE_CREDENTIALS else None,
+            use_tls=Config.MAIL_SSL_TLS,
+            start_tls=Config.MAIL_STARTTLS,
+            validate_certs=Config.VALIDATE_CERTS,
+        )
+
+    async def connect(self) -> aiosmtplib.SMTP:
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(**self._options)
+            await smtp.connect()
+            self._smtp = smtp
+        return self._smtp
+
+    async def send(self, message: EmailMessage) -> None:
+        async with self._lock:
+            smtp = await self.connect()
+            try:
+                await smtp.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                # idle connections get closed by the server, retry once on a new one
+                smtp = await self.connect()
+                await smtp.send_message(message)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._smtp is not None and self._smtp.is_connected:
+                try:
+                    await self._smtp.quit()
+                except aiosmtplib.SMTPException:
+                    self._smtp.close()
+            self._smtp = None
+
+
+@dataclass
+class BulkDeliveryReport:
+    sent: List[str] = field(default_factory=list)
+    # recipients refused with a 5xx reply, retrying would not help
+    rejected: Dict[str, str] = field(default_factory=dict)
+    # recipients that failed with a transient error and are worth retrying
+    deferred: Dict[str, str] = field(default_factory=dict)
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return len(self.sent) / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "sent": len(self.sent),
+            "rejected": self.rejected,
+            "deferred": self.deferred,
+            "batches": self.batches,
+            "elapsed": round(self.elapsed, 3),
+            "throughput": round(self.throughput, 2),
+        }
+
+
+def build_message(recipient: str, subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((Config.MAIL_FROM_NAME, Config.MAIL_FROM))
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.set_content(body, subtype="html")
+    return message
+
+
+async def deliver_bulk(
+    client: SMTPClient,
+    recipients: List[str],
+    subject: str,
+    body: Union[str, Callable[[str], str]],
+    batch_size: int,
+    rate_per_second: float,
+    rate_per_domain: float = 0,
+) -> BulkDeliveryReport:
+    """
+    Send one message per recipient over the client's connection.
+    Recipients go out in batches of batch_size, paced to at most
+    rate_per_second messages overall and rate_per_domain messages to
+    any one recipient domain (0 for no limit). Receiving servers
+    throttle per domain, every recipient gets a single message anyway.
+    Recipients are sent in order, one waiting for its domain holds back
+    those after it. Failures are recorded per recipient instead of
+    aborting the batch. body may be a callable rendering the body for a
+    given recipient.
+    """
+    report = BulkDeliveryReport()
+    interval = 1 / rate_per_second if rate_per_second > 0 else 0
+    domain_interval = 1 / rate_per_domain if rate_per_domain > 0 else 0
+    started = time.perf_counter()
+    next_send = started
+    # domain -> earliest time of its next message
+    next_by_domain: Dict[str, float] = {}
+
+    for start in range(0, len(recipients), batch_size):
+        report.batches += 1
+        for recipient in recipients[start:start + batch_size]:
+            domain = recipient.rpartition("@")[2].lower()
+            domain_next = next_by_domain.get(domain, started)
+            delay = max(next_send, domain_next) - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = time.perf_counter()
+            next_send = max(next_send, now) + interval
+            if domain_interval:
+                next_by_domain[domain] = max(domain_next, now) + domain_interval
+
+            try:
+                content = body(recipient) if callable(body) else body
+                await client.send(build_message(recipient, subject, content))
+            except aiosmtplib.SMTPRecipientsRefused as e:
+                refused = e.recipients[0]
+                failures = report.rejected if refused.code >= 500 else report.deferred
+                failures[recipient] = f"{refused.code} {refused.message}"
+            except aiosmtplib.SMTPResponseException as e:
+                failures = report.rejected if e.code >= 500 else report.deferred
+                failures[recipient] = f"{e.code} {e.message}"
+            except (aiosmtplib.SMTPException, OSError) as e:
+                report.deferred[recipient] = str(e)
+            else:
+                report.sent.append(recipient)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+# template name -> subject of the email it renders
+EMAIL_TEMPLATES = {
+    "verify_email.html": "Verify your email",
+    "password_reset.html": "Reset Your Password",
+    "welcome.html": "Welcome",
+}
+
+
+class EmailTemplates:
+    """
+    Compiled transactional email templates.
+    Call load() once when the worker starts, renders then only fill in context.
+    """
+
+    def __init__(self, folder: Path, subjects: Dict[str, str]) -> None:
+        self.subjects = subjects
+        self._env = Environment(
+            loader=FileSystemLoader(folder),
+            autoescape=True,
+            undefined=StrictUndefined,
+            auto_reload=False,
+        )
+        self._env.globals["domain"] = Config.DOMAIN
+        self._compiled: Dict[str, Template] = {}
+
+    def load(self) -> None:
+        for name in self.subjects:
+            self._compiled[name] = self._env.get_template(name)
+
+    def subject(self, name: str) -> str:
+        return self.subjects[name]
+
+    def render(self, name: str, context: dict) -> str:
+        template = self._compiled.get(name)
+        if template is None:
+            if name not in self.subjects:
+                raise KeyError(f"unknown email template {name!r}")
+            template = self._compiled[name] = self._env.get_template(name)
+        return template.render(context)
+
+
+email_templates = EmailTemplates(TEMPLATE_FOLDER, EMAIL_TEMPLATES)
+
+smtp_client = SMTPClient.from_config()
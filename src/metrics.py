@@ -0,0 +1,113 @@
+"""
+Prometheus metrics of the API process.
+
+With several workers (gunicorn, `uvicorn --workers`) set
+PROMETHEUS_MULTIPROC_DIR to an empty directory, the same for all workers and
+wiped on every deploy. Each worker then writes its samples there and
+/metrics aggregates all of them, whichever worker serves the scrape.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client import REGISTRY
+
+# label used for requests that matched no route, so unknown paths can't
+# blow up the number of series
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_LATENCY = Histogram(
+    "bookly_http_request_duration_seconds",
+    "Time spent handling a request, by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+REQUESTS = Counter(
+    "bookly_http_requests_total",
+    "Requests handled, by route template and status code",
+    ["method", "route", "status"],
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "bookly_http_requests_in_flight",
+    "Requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+REQUEST_STATEMENTS = Histogram(
+    "bookly_http_request_db_statements",
+    "SQL statements issued while handling a request, by route template",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+
+REQUEST_DB_TIME = Histogram(
+    "bookly_http_request_db_seconds",
+    "Time spent in the database while handling a request, by route template",
+    ["method", "route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "bookly_db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "bookly_db_pool_overflow",
+    "Database connections checked out beyond the pool size",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_WAIT = Histogram(
+    "bookly_db_pool_wait_seconds",
+    "Time spent checking a database connection out of the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+DB_POOL_CONNECTIONS_OPENED = Counter(
+    "bookly_db_pool_connections_opened_total",
+    "Database connections opened by the pool",
+)
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "bookly_response_cache_requests_total",
+    "Response cache lookups by result: hits, misses, coalesced or errors",
+    ["result"],
+)
+
+RATE_LIMITED = Counter(
+    "bookly_rate_limited_total",
+    "Requests rejected by a rate limit, by limited route",
+    ["route"],
+)
+
+
+def multiprocess_enabled() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Exposition of all metrics, aggregated over workers in multiprocess mode"""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop the live gauges of a worker that exited, call from the process manager"""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
@@ -7,22 +7,64 @@ import time
 import logging
 
 from src.config import Config
+from src.db.query_stats import track_queries
+from src.metrics import (
+    REQUEST_DB_TIME,
+    REQUEST_LATENCY,
+    REQUEST_STATEMENTS,
+    REQUESTS,
+    REQUESTS_IN_FLIGHT,
+    UNMATCHED_ROUTE,
+)
+
+# custom_logging writes the access log, uvicorn's would duplicate it
+logging.getLogger('uvicorn.access').disabled = True
+access_logger = logging.getLogger('bookly.access')
+
+
+def route_template(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
 
-logger = logging.getLogger('uvicorn.access')
-logger.disabled = True
 def register_middleware(app:FastAPI):
     
     
     @app.middleware('http')
     async def custom_logging(request:Request, call_next):
-        start_time = time.time()
-        
-        print("before",start_time)
-        response = await call_next(request)
-        processing_time = time.time() - start_time
-        message = f"{request.method} - {request.url.path} - {response.status_code} - completed after {processing_time}"
-        print(message)
-        return response
+        start = time.perf_counter_ns()
+        method = request.method
+        # the route is only known once the router ran, so in-flight is per method
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        status_code = 500
+        with track_queries(Config.QUERY_BUDGET, Config.QUERY_BUDGET_MODE) as queries:
+            try:
+                response = await call_next(request)
+                status_code = response.status_code
+                response.headers.append("Server-Timing", queries.server_timing())
+                return response
+            finally:
+                in_flight.dec()
+                elapsed_ns = time.perf_counter_ns() - start
+                route = route_template(request)
+                REQUEST_LATENCY.labels(method, route).observe(elapsed_ns / 1e9)
+                REQUESTS.labels(method, route, str(status_code)).inc()
+                REQUEST_STATEMENTS.labels(method, route).observe(queries.statements)
+                REQUEST_DB_TIME.labels(method, route).observe(queries.duration)
+                access_logger.info(
+                    "%s %s %s", method, request.url.path, status_code,
+                    extra={
+                        "method": method,
+                        "path": request.url.path,
+                        "route": route,
+                        "status": status_code,
+                        "duration_ms": round(elapsed_ns / 1e6, 3),
+                        "db_statements": queries.statements,
+                        "db_rows": queries.rows,
+                        "db_ms": round(queries.duration * 1000, 3),
+                    },
+                )
     
     # @app.middleware('http')
     # async def authorization(request:Request, call_next):
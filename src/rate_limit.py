@@ -0,0 +1,187 @@
+"""
+Rate limiting backed by Redis.
+
+Each limit is a sliding window log: a sorted set per key holding the
+times of the hits accepted during the last window. One Lua script checks
+every limit a request falls under and records the hit in all of them only
+if none is full, so concurrent requests on any worker can't overshoot and
+a rejected request uses up nobody's allowance. Times come from the Redis
+server clock, so workers with skewed clocks still share one window.
+
+When Redis is unreachable the same limits are enforced per process with
+pyrate-limiter in-memory buckets. N workers then accept up to N times a
+limit, which still keeps a floor under abuse until Redis is back.
+"""
+import hashlib
+import logging
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import Request
+from pyrate_limiter import InMemoryBucket, Rate, RateItem
+from redis.exceptions import RedisError
+
+from src.auth.cache import TTLCache
+from src.config import Config
+from src.db.redis import redis_client
+from src.errors import RateLimitExceeded
+from src.metrics import RATE_LIMITED
+
+logger = logging.getLogger("bookly.rate_limit")
+
+RATE_LIMIT_PREFIX = "bookly:ratelimit:"
+# upper bound on any window, fallback buckets are dropped sooner once idle
+MAX_WINDOW = 24 * 3600
+
+# KEYS: one sorted set per limit
+# ARGV: hit id, then limit and window in ms for each key
+# returns 0 when the hit is recorded, otherwise ms until it would fit
+SLIDING_WINDOW = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i])
+    local window = tonumber(ARGV[2 * i + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    if count >= limit then
+        local bound = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(bound[2]) + window - now)
+    end
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[1])
+    redis.call('PEXPIRE', key, ARGV[2 * i + 1])
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """At most `limit` hits in any `window` seconds"""
+
+    limit: int
+    window: float
+
+    @property
+    def window_ms(self) -> int:
+        return int(self.window * 1000)
+
+
+class SlidingWindowLimiter:
+    def __init__(self, redis, fallback_size: int) -> None:
+        self.redis = redis
+        self._script = redis.register_script(SLIDING_WINDOW)
+        self._fallback = TTLCache(maxsize=fallback_size, ttl=MAX_WINDOW)
+        self._degraded = False
+
+    async def hit(self, limits: Sequence[Tuple[str, RateLimit]]) -> float:
+        """Record one hit against every (key, limit) if none is full.
+        Returns 0 when recorded, otherwise seconds until it would be."""
+        if not limits:
+            return 0
+        keys = [RATE_LIMIT_PREFIX + key for key, _ in limits]
+        args: List = [uuid.uuid4().hex]
+        for _, limit in limits:
+            args += [limit.limit, limit.window_ms]
+        try:
+            retry_after = await self._script(keys=keys, args=args)
+        except RedisError as e:
+            if not self._degraded:
+                logger.warning("rate limits enforced per process, Redis failed: %s", e)
+                self._degraded = True
+            return self._hit_fallback(keys, limits)
+
+        if self._degraded:
+            logger.warning("rate limits enforced in Redis again")
+            self._degraded = False
+        return retry_after / 1000
+
+    def _hit_fallback(self, keys: Sequence[str], limits: Sequence[Tuple[str, RateLimit]]) -> float:
+        # hits recorded before a full bucket is found stay recorded, so the
+        # most specific limits come first
+        now = int(time.monotonic() * 1000)
+        for key, (_, limit) in zip(keys, limits):
+            bucket = self._fallback.get(key)
+            if bucket is None:
+                bucket = InMemoryBucket([Rate(limit.limit, limit.window_ms)])
+            bucket.leak(now)
+            item = RateItem(key, now)
+            if not bucket.put(item):
+                return bucket.waiting(item) / 1000
+            # kept until a window has passed since its latest hit
+            self._fallback.set(key, bucket, ttl=limit.window)
+        return 0
+
+
+limiter = SlidingWindowLimiter(redis_client, fallback_size=Config.RATE_LIMIT_FALLBACK_SIZE)
+
+
+def client_ip(request: Request) -> str:
+    """Address of the client, run uvicorn with --proxy-headers behind a proxy"""
+    return request.client.host if request.client else "unknown"
+
+
+def hashed(value: str) -> str:
+    """Identity as stored in keys, so Redis holds no email addresses"""
+    return hashlib.blake2b(value.strip().lower().encode(), digest_size=16).hexdigest()
+
+
+class RateLimiter:
+    """
+    Dependency limiting a route per client IP, per target account and
+    across all clients. The account is the `user_field` of the JSON body,
+    e.g. the email a login or password reset is for, so guessing at one
+    account from many addresses is limited too.
+    Over a limit the request fails with RateLimitExceeded (429 and Retry-After).
+    """
+
+    def __init__(
+        self,
+        route: str,
+        per_ip: Optional[RateLimit] = None,
+        per_user: Optional[RateLimit] = None,
+        per_route: Optional[RateLimit] = None,
+        user_field: str = "email",
+    ) -> None:
+        self.route = route
+        self.per_ip = per_ip
+        self.per_user = per_user
+        self.per_route = per_route
+        self.user_field = user_field
+
+    async def __call__(self, request: Request) -> None:
+        if not Config.RATE_LIMIT_ENABLED:
+            return
+
+        limits = []
+        if self.per_user:
+            user = await self._user(request)
+            if user:
+                limits.append((f"{self.route}:user:{hashed(user)}", self.per_user))
+        if self.per_ip:
+            limits.append((f"{self.route}:ip:{client_ip(request)}", self.per_ip))
+        if self.per_route:
+            limits.append((f"{self.route}:all", self.per_route))
+
+        retry_after = await limiter.hit(limits)
+        if retry_after:
+            RATE_LIMITED.labels(self.route).inc()
+            raise RateLimitExceeded(math.ceil(retry_after))
+
+    async def _user(self, request: Request) -> Optional[str]:
+        # the body was already parsed for the endpoint, this reads the cached copy
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        value = body.get(self.user_field) if isinstance(body, dict) else None
+        return value if isinstance(value, str) else None
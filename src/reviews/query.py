@@ -0,0 +1,92 @@
+"""
+Filters and sort orders for review listings.
+
+Each sort is a keyset on columns ending with the review uid. Listings of
+one book's reviews are served by an index on (book_uid, sort columns).
+
+The admin listing is newest first. Each of its equality filters (user,
+book, rating) leads an index on (column, created_at, uid), and the
+unfiltered listing walks (created_at, uid), so a page and any created_at
+range cost an index range scan. When several equality filters are
+combined, Postgres picks one of those indexes and checks the other
+filters on its rows.
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel, Field
+from sqlmodel import select
+
+from src.db.export import naive_datetime
+from src.db.models import Review
+from src.db.pagination import decode_cursor, keyset_after
+from src.errors import InvalidCursor
+
+
+@dataclass(frozen=True)
+class ReviewSort:
+    columns: Tuple[Any, ...]
+    # types of the values in a cursor, a cursor of another sort is rejected
+    value_types: Tuple[type, ...]
+
+
+DEFAULT_REVIEW_SORT = "newest"
+
+REVIEW_SORTS: Dict[str, ReviewSort] = {
+    "newest": ReviewSort((Review.created_at, Review.uid), (datetime, uuid.UUID)),
+    # highest rated first, the newest of them first
+    "rating": ReviewSort((Review.rating, Review.created_at, Review.uid), (int, datetime, uuid.UUID)),
+}
+
+
+class ReviewFilters(BaseModel):
+    user_uid: Optional[uuid.UUID] = None
+    book_uid: Optional[uuid.UUID] = None
+    rating: Optional[int] = Field(default=None, ge=1, le=5)
+    # created_from inclusive, created_to exclusive
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+
+def filter_reviews(statement, filters: ReviewFilters):
+    if filters.user_uid is not None:
+        statement = statement.where(Review.user_uid == filters.user_uid)
+    if filters.book_uid is not None:
+        statement = statement.where(Review.book_uid == filters.book_uid)
+    if filters.rating is not None:
+        statement = statement.where(Review.rating == filters.rating)
+
+    created_from, created_to = naive_datetime(filters.created_from), naive_datetime(filters.created_to)
+    if created_from is not None:
+        statement = statement.where(Review.created_at >= created_from)
+    if created_to is not None:
+        statement = statement.where(Review.created_at < created_to)
+    return statement
+
+
+def sorted_reviews(statement, sort: str, cursor: Optional[str], limit: int):
+    """Keyset paginate a select of reviews in one of REVIEW_SORTS, newest first"""
+    review_sort = REVIEW_SORTS[sort]
+    values = None
+    if cursor:
+        values = decode_cursor(cursor, len(review_sort.columns))
+        if any(type(value) is not value_type for value, value_type in zip(values, review_sort.value_types)):
+            raise InvalidCursor()
+    return keyset_after(statement, review_sort.columns, values, descending=True).limit(limit + 1)
+
+
+def book_reviews_statement(book_uid, sort: str, cursor: Optional[str], limit: int):
+    return sorted_reviews(select(Review).where(Review.book_uid == book_uid), sort, cursor, limit)
+
+
+def review_list_statement(filters: ReviewFilters, cursor: Optional[str], limit: int):
+    """Keyset paginated select of the reviews matching filters, newest first"""
+    return sorted_reviews(filter_reviews(select(Review), filters), "newest", cursor, limit)
+
+
+def review_sort_key(sort: str):
+    """Cursor values of a review in the given sort order"""
+    keys = [column.key for column in REVIEW_SORTS[sort].columns]
+    return lambda review: tuple(getattr(review, key) for key in keys)
@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, status
+import uuid
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.auth.dependencies import RoleChecker, get_current_user
-from src.constants import ADMIN_ROLE, ALLOWED_ROLES
+from src.constants import ADMIN_ROLE, ALLOWED_ROLES, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.db.export import export_response
 from src.db.main import get_session
-from src.db.models import User
+from src.etag import etag_matches, make_etag, not_modified
+from src.auth.schemas import UserPrincipal
 
-from src.reviews.schemas import ReviewCreateModel
-from src.reviews.service import ReviewService
+from src.reviews.query import ReviewFilters
+from src.reviews.schemas import ReviewCreateModel, ReviewModel, ReviewPage
+from src.reviews.service import REVIEW_EXPORT_COLUMNS, ReviewService
 
 review_service = ReviewService()
 review_router = APIRouter()
@@ -15,26 +23,82 @@ admin_role_checker = Depends(RoleChecker([ADMIN_ROLE]))
 user_role_checker = Depends(RoleChecker(ALLOWED_ROLES))
 
 
-@review_router.get("/", dependencies=[admin_role_checker])
-async def get_all_reviews(session: AsyncSession = Depends(get_session)):
-    books = await review_service.get_all_reviews(session)
+@review_router.get("/", response_model=ReviewPage, dependencies=[admin_role_checker])
+async def get_all_reviews(
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    filters: ReviewFilters = Depends(),
+    session: AsyncSession = Depends(get_session),
+):
+    """Reviews matching the filters, newest first, one page at a time"""
+    reviews = await review_service.get_all_reviews(
+        session, filters=filters, limit=limit, cursor=cursor
+    )
+
+    return reviews
+
+
+@review_router.get(
+    "/export", dependencies=[admin_role_checker], response_class=StreamingResponse
+)
+async def export_reviews(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user_uid: Optional[uuid.UUID] = None,
+    book_uid: Optional[uuid.UUID] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+):
+    """Stream reviews oldest first. Every row has a `cursor`, pass the last one
+    received to resume an interrupted export."""
+    statement = review_service.export_statement(
+        user_uid=user_uid,
+        book_uid=book_uid,
+        created_from=created_from,
+        created_to=created_to,
+        cursor=cursor,
+    )
+
+    return export_response(
+        statement,
+        [column.key for column in REVIEW_EXPORT_COLUMNS],
+        ("created_at", "uid"),
+        format,
+        "reviews",
+    )
+
+
+@review_router.get(
+    "/{review_uid}", response_model=ReviewModel, dependencies=[user_role_checker]
+)
+async def get_review(
+    review_uid: str,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+):
+    review = await review_service.get_review(review_uid, session)
+
+    if not review:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Review not found"
+        )
 
-    return books
+    etag = make_etag(review.uid, review.update_at)
 
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-@review_router.get("/{review_uid}", dependencies=[user_role_checker])
-async def get_review(review_uid: str, session: AsyncSession = Depends(get_session)):
-    book = await review_service.get_review(review_uid, session)
+    response.headers["ETag"] = etag
 
-    if not book:
-        raise
+    return review
 
 
 @review_router.post("/book/{book_uid}", dependencies=[user_role_checker])
 async def add_review_to_books(
     book_uid: str,
     review_data: ReviewCreateModel,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
     new_review = await review_service.add_review_to_book(
@@ -54,7 +118,7 @@ async def add_review_to_books(
 )
 async def delete_review(
     review_uid: str,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
     await review_service.delete_review_to_from_book(
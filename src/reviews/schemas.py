@@ -1,13 +1,14 @@
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
 
 class ReviewModel(BaseModel):
     uid: uuid.UUID
-    rating: int = Field(lte=5)
+    # not bounded, reviews stored before ratings were validated must still serialize
+    rating: int
     review_text: str
     user_uid: Optional[uuid.UUID]
     book_uid: Optional[uuid.UUID]
@@ -16,5 +17,10 @@ class ReviewModel(BaseModel):
 
 
 class ReviewCreateModel(BaseModel):
-    rating: int = Field(lt=5)
-    review_text: str
\ No newline at end of file
+    rating: int = Field(ge=1, le=5)
+    review_text: str
+
+
+class ReviewPage(BaseModel):
+    items: List[ReviewModel]
+    next_cursor: Optional[str] = None
@@ -1,19 +1,29 @@
 import logging
+from datetime import datetime
+from typing import Optional
 
 from fastapi import status
 from fastapi.exceptions import HTTPException
-from sqlmodel import desc, select
+from sqlmodel import delete, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.auth.service import UserService
 from src.books.service import BookService
+from src.constants import DEFAULT_PAGE_SIZE
 from src.db.models import Review
+from src.db.pagination import build_page, keyset
+from src.reviews.query import ReviewFilters, filter_reviews, review_list_statement, review_sort_key
 
 from src.reviews.schemas import ReviewCreateModel
 
 book_service = BookService()
 user_service = UserService()
 
+REVIEW_EXPORT_COLUMNS = (
+    Review.uid, Review.rating, Review.review_text, Review.user_uid,
+    Review.book_uid, Review.created_at, Review.update_at,
+)
+
 
 class ReviewService:
     async def add_review_to_book(
@@ -41,12 +51,14 @@ class ReviewService:
                     detail="Book not found", status_code=status.HTTP_404_NOT_FOUND
                 )
 
-            new_review.user = user
+            new_review.user_uid = user.uid
 
-            new_review.book = book
+            new_review.book_uid = book.uid
 
             session.add(new_review)
 
+            await book_service.record_rating(session, book.uid, new_review.rating, 1)
+
             await session.commit()
 
             return new_review
@@ -65,12 +77,37 @@ class ReviewService:
 
         return result.first()
 
-    async def get_all_reviews(self, session: AsyncSession):
-        statement = select(Review).order_by(desc(Review.created_at))
+    async def get_all_reviews(
+        self,
+        session: AsyncSession,
+        filters: Optional[ReviewFilters] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        statement = review_list_statement(filters or ReviewFilters(), cursor, limit)
 
         result = await session.exec(statement)
 
-        return result.all()
+        return build_page(result.all(), limit, review_sort_key("newest"))
+
+    def export_statement(
+        self,
+        user_uid: Optional[str] = None,
+        book_uid: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+    ):
+        """Columns of the matching reviews, oldest first so rows added during an export come last"""
+        filters = ReviewFilters(
+            user_uid=user_uid,
+            book_uid=book_uid,
+            created_from=created_from,
+            created_to=created_to,
+        )
+        statement = filter_reviews(select(*REVIEW_EXPORT_COLUMNS), filters)
+
+        return keyset(statement, (Review.created_at, Review.uid), cursor, descending=False)
 
     async def delete_review_to_from_book(
         self, review_uid: str, user_email: str, session: AsyncSession
@@ -79,12 +116,19 @@ class ReviewService:
 
         review = await self.get_review(review_uid, session)
 
-        if not review or (review.user is not user):
+        if not review or (review.user_uid != user.uid):
             raise HTTPException(
                 detail="Cannot delete this review",
                 status_code=status.HTTP_403_FORBIDDEN,
             )
 
-        session.add(review)
+        # a review deleted concurrently must only be subtracted once
+        deleted = await session.exec(
+            delete(Review).where(Review.uid == review.uid).returning(Review.rating)
+        )
+        rating = deleted.scalar_one_or_none()
+
+        if rating is not None:
+            await book_service.record_rating(session, review.book_uid, rating, -1)
 
         await session.commit()
\ No newline at end of file
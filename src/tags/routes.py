@@ -1,6 +1,6 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 
@@ -18,9 +18,9 @@ user_role_checker = Depends(RoleChecker(["user", "admin"]))
 
 @tags_router.get("/", response_model=List[TagModel], dependencies=[user_role_checker])
 async def get_all_tags(session: AsyncSession = Depends(get_session)):
-    tags = await tag_service.get_tags(session)
+    tags_json = await tag_service.get_tags_json(session)
 
-    return tags
+    return Response(content=tags_json, media_type="application/json")
 
 
 @tags_router.post(
@@ -1,16 +1,32 @@
+import uuid
+from datetime import datetime
+from typing import List, Tuple
+
 from fastapi import status
 from fastapi.exceptions import HTTPException
-from sqlmodel import desc, select
+from pydantic import TypeAdapter
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import delete, desc, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.books.service import BookService
-from src.db.models import Tag
+from src.db.cache import TAGS_KEY, response_cache
+from src.db.loading import TAG_SUMMARY
+from src.db.models import Book, BookTag, Tag
 
-from .schemas import TagAddModel, TagCreateModel
+from .schemas import TagAddModel, TagCreateModel, TagModel
 
 book_service = BookService()
 
 
+def tag_exists() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Tag exists")
+
+
+tag_list_adapter = TypeAdapter(List[TagModel])
+
+
 server_error = HTTPException(
     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Something went wrong"
 )
@@ -27,37 +43,112 @@ class TagService:
 
         return result.all()
 
+    async def get_tags_json(self, session: AsyncSession):
+        """All tags as JSON, served from the response cache"""
+
+        async def load_tags():
+            tags = await self.get_tags(session)
+            return tag_list_adapter.dump_json(
+                tag_list_adapter.validate_python(tags, from_attributes=True)
+            )
+
+        return await response_cache.get_or_load_current(TAGS_KEY, load_tags)
+
     async def add_tags_to_book(
         self, book_uid: str, tag_data: TagAddModel, session: AsyncSession
     ):
-        """Add tags to a book"""
+        """Add tags to a book, skipping tags it already has"""
 
         book = await book_service.get_book(book_uid=book_uid, session=session)
 
         if not book:
             raise HTTPException(status_code=404, detail="Book not found")
 
-        for tag_item in tag_data.tags:
+        tag_uids, created = await self.resolve_tags(
+            [tag_item.name for tag_item in tag_data.tags], session
+        )
+
+        if tag_uids:
             result = await session.exec(
-                select(Tag).where(Tag.name == tag_item.name)
+                insert(BookTag)
+                .values([{"book_id": book.uid, "tag_id": tag_uid} for tag_uid in tag_uids])
+                .on_conflict_do_nothing()
+                .returning(BookTag.tag_id)
             )
 
-            tag = result.one_or_none()
-            if not tag:
-                tag = Tag(name=tag_item.name)
+            if result.all():
+                await book_service.touch_books(session, Book.uid == book.uid)
 
-            book.tags.append(tag)
-        session.add(book)
         await session.commit()
-        await session.refresh(book)
+        if created:
+            await response_cache.new_generation(TAGS_KEY)
         return book
 
+    async def resolve_tags(
+        self, names: List[str], session: AsyncSession
+    ) -> Tuple[List[uuid.UUID], List[str]]:
+        """Get the uids of tags by name, creating the missing ones.
+        Also returns the names of the tags this call inserted.
+
+        Costs one IN query, plus one multi-row insert when some are missing,
+        whatever the number of names.
+        """
+
+        names = list(dict.fromkeys(names))
+
+        if not names:
+            return [], []
+
+        result = await session.exec(select(Tag.uid, Tag.name).where(Tag.name.in_(names)))
+
+        uids_by_name = {name: uid for uid, name in result.all()}
+
+        missing = [name for name in names if name not in uids_by_name]
+
+        inserted = {}
+
+        if missing:
+            now = datetime.now()
+
+            result = await session.exec(
+                insert(Tag)
+                .values([{"uid": uuid.uuid4(), "name": name, "created_at": now} for name in missing])
+                .on_conflict_do_nothing(index_elements=["name"])
+                .returning(Tag.uid, Tag.name)
+            )
+
+            inserted = {name: uid for uid, name in result.all()}
+            uids_by_name.update(inserted)
 
+            # names inserted by a concurrent request since the first lookup
+            raced = [name for name in missing if name not in uids_by_name]
 
-    async def get_tag_by_uid(self, tag_uid: str, session: AsyncSession):
+            if raced:
+                result = await session.exec(
+                    select(Tag.uid, Tag.name).where(Tag.name.in_(raced))
+                )
+                uids_by_name.update({name: uid for uid, name in result.all()})
+
+        return [uids_by_name[name] for name in names], list(inserted)
+
+
+
+    async def _flush_unique_name(self, session: AsyncSession):
+        """Flush a new or renamed tag, turning a name taken by another tag
+        (uq_tags_name) into a 403"""
+
+        try:
+            await session.flush()
+        except IntegrityError:
+            await session.rollback()
+            raise tag_exists()
+
+    async def get_tag_by_uid(
+        self, tag_uid: str, session: AsyncSession, options: tuple = TAG_SUMMARY
+    ):
         """Get tag by uid"""
 
-        statement = select(Tag).where(Tag.uid == tag_uid)
+        statement = select(Tag).where(Tag.uid == tag_uid).options(*options)
 
         result = await session.exec(statement)
 
@@ -73,16 +164,18 @@ class TagService:
         tag = result.first()
 
         if tag:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail="Tag exists"
-            )
+            raise tag_exists()
 
         new_tag = Tag(name=tag_data.name)
 
         session.add(new_tag)
 
+        await self._flush_unique_name(session)
+
         await session.commit()
 
+        await response_cache.new_generation(TAGS_KEY)
+
         return new_tag
 
     async def update_tag(
@@ -97,9 +190,16 @@ class TagService:
         for k, v in update_data_dict.items():
             setattr(tag, k, v)
 
-            await session.commit()
+        # before touching the books, whose UPDATE would autoflush the rename
+        await self._flush_unique_name(session)
 
-            await session.refresh(tag)
+        await self._touch_tagged_books(tag.uid, session)
+
+        await session.commit()
+
+        await session.refresh(tag)
+
+        await response_cache.new_generation(TAGS_KEY)
 
         return tag
 
@@ -107,13 +207,27 @@ class TagService:
     async def delete_tag(self, tag_uid: str, session: AsyncSession):
         """Delete a tag"""
 
-        tag = self.get_tag_by_uid(tag_uid,session)
+        tag = await self.get_tag_by_uid(tag_uid, session)
 
         if not tag:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Tag does not exist"
             )
 
-        await session.delete(tag)
+        await self._touch_tagged_books(tag.uid, session)
+
+        # the links go in one statement, without loading the tagged books
+        await session.exec(delete(BookTag).where(BookTag.tag_id == tag.uid))
+
+        await session.exec(delete(Tag).where(Tag.uid == tag.uid))
+
+        await session.commit()
+
+        await response_cache.new_generation(TAGS_KEY)
+
+    async def _touch_tagged_books(self, tag_uid, session: AsyncSession):
+        """Mark every book carrying the tag as changed"""
 
-        await session.commit()
\ No newline at end of file
+        await book_service.touch_books(
+            session, Book.uid.in_(select(BookTag.book_id).where(BookTag.tag_id == tag_uid))
+        )
\ No newline at end of file
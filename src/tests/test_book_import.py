@@ -0,0 +1,54 @@
+import asyncio
+
+from src.books.importer import iter_csv, iter_ndjson, records_for
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(records) -> list:
+    async def run():
+        return [record async for record in records]
+
+    return asyncio.run(run())
+
+
+def test_csv_records_span_chunks_and_quoted_newlines():
+    body = 'title,author,tags\n"Héloïse,\nAgain",Rousseau,fiction|classic\nshort\n'.encode()
+    # split inside the multi-byte "é" and inside the quoted value
+    chunks = [body[:19], body[19:30], body[30:]]
+
+    records = collect(iter_csv(stream(*chunks)))
+
+    assert records == [
+        (1, {"title": "Héloïse,\nAgain", "author": "Rousseau", "tags": "fiction|classic"}),
+        (2, "expected 3 columns, got 1"),
+    ]
+
+
+def test_ndjson_reports_bad_lines_by_number():
+    records = collect(iter_ndjson(stream(b'{"title": "A"}\n\n[1]\n{bad', b"\n")))
+
+    assert records[0] == (1, {"title": "A"})
+    assert records[1] == (3, "expected a JSON object")
+    assert records[2][0] == 4 and records[2][1].startswith("invalid JSON")
+
+
+def test_unsupported_media_type_has_no_parser():
+    assert records_for("text/plain", stream()) is None
+    assert records_for("text/csv; charset=utf-8", stream()) is not None
+
+
+def test_csv_stray_quote_fails_one_row_only():
+    rows = "".join(f"Title {i},Author,fiction\n" for i in range(10))
+    body = f'title,author,tags\nA "stray quote,Author,fiction\n{rows}'.encode()
+
+    records = collect(iter_csv(stream(body), max_record_size=60))
+
+    assert records[0] == (1, "quoted value not closed within 60 characters")
+    # the two lines swallowed up to the limit are lost with the broken row
+    assert records[1:] == [
+        (i, {"title": f"Title {i}", "author": "Author", "tags": "fiction"}) for i in range(2, 10)
+    ]
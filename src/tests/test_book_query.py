@@ -0,0 +1,68 @@
+import uuid
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.books.query import BookFilters, book_list_statement
+from src.db.pagination import encode_cursor
+from src.reviews.query import ReviewFilters, book_reviews_statement, review_list_statement
+from src.errors import InvalidCursor, UnsupportedBookQuery
+
+
+def compile_sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_sort_and_filter_follow_the_index():
+    sql = compile_sql(book_list_statement(BookFilters(author="Le Guin"), "title", None, 20))
+    assert "books.author = " in sql
+    assert "ORDER BY books.title ASC, books.uid ASC" in sql
+
+    cursor = encode_cursor([date(2001, 5, 1), uuid.uuid4()])
+    filters = BookFilters(published_from=date(2000, 1, 1))
+    sql = compile_sql(book_list_statement(filters, "published", cursor, 20))
+    assert "books.published_date >= " in sql
+    assert "(books.published_date, books.uid) < (" in sql
+
+
+@pytest.mark.parametrize(
+    "filters,sort",
+    [
+        (BookFilters(author="Le Guin", language="en"), "newest"),
+        (BookFilters(publisher="Ace"), "pages"),
+        (BookFilters(min_pages=100), "newest"),
+        (BookFilters(), "rating"),
+    ],
+)
+def test_unindexed_combinations_rejected(filters, sort):
+    with pytest.raises(UnsupportedBookQuery):
+        book_list_statement(filters, sort, None, 20)
+
+
+def test_cursor_of_another_sort_rejected():
+    cursor = encode_cursor([datetime(2025, 1, 1), uuid.uuid4()])
+    with pytest.raises(InvalidCursor):
+        book_list_statement(BookFilters(), "title", cursor, 20)
+    with pytest.raises(InvalidCursor):
+        book_list_statement(BookFilters(), "published", cursor, 20)
+
+
+def test_book_reviews_by_rating():
+    cursor = encode_cursor([4, datetime(2025, 1, 1), uuid.uuid4()])
+    sql = compile_sql(book_reviews_statement(uuid.uuid4(), "rating", cursor, 20))
+    assert "(reviews.rating, reviews.created_at, reviews.uid) < (" in sql
+    assert "ORDER BY reviews.rating DESC, reviews.created_at DESC, reviews.uid DESC" in sql
+
+    newest = encode_cursor([datetime(2025, 1, 1), uuid.uuid4()])
+    with pytest.raises(InvalidCursor):
+        book_reviews_statement(uuid.uuid4(), "rating", newest, 20)
+
+
+def test_review_listing_filters():
+    filters = ReviewFilters(user_uid=uuid.uuid4(), rating=5, created_to=datetime(2025, 1, 1))
+    sql = compile_sql(review_list_statement(filters, None, 20))
+    assert "reviews.user_uid = " in sql
+    assert "reviews.rating = " in sql
+    assert "reviews.created_at < " in sql
+    assert "ORDER BY reviews.created_at DESC, reviews.uid DESC" in sql
@@ -0,0 +1,137 @@
+import asyncio
+import socket
+from unittest.mock import patch
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from src import celery_tasks
+from src.mail import SMTPClient, deliver_bulk, email_templates
+from src.worker_loop import worker_loop
+
+
+class SinkHandler:
+    def __init__(self):
+        self.delivered = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("gone"):
+            return "550 mailbox unavailable"
+        if address.startswith("busy"):
+            return "451 try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_deliver_bulk_reuses_connection_and_sorts_failures():
+    handler = SinkHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    recipients = [f"reader{i}@mail.com" for i in range(5)] + ["gone@mail.com", "busy@mail.com"]
+
+    async def run():
+        client = SMTPClient("127.0.0.1", controller.port, start_tls=False)
+        try:
+            return await deliver_bulk(client, recipients, "Hi", "<p>Hi</p>", batch_size=3, rate_per_second=0)
+        finally:
+            await client.close()
+
+    try:
+        report = asyncio.run(run())
+    finally:
+        controller.stop()
+
+    assert handler.delivered == recipients[:5]
+    assert handler.connections == 1
+    assert report.sent == recipients[:5]
+    assert list(report.rejected) == ["gone@mail.com"]
+    assert list(report.deferred) == ["busy@mail.com"]
+    assert report.batches == 3
+
+
+def test_templates_render_per_recipient_context():
+    email_templates.load()
+
+    html = email_templates.render("verify_email.html", {"token": "abc<", "email": "reader@mail.com"})
+
+    assert "/api/v1/auth/verify/abc&lt;" in html
+    assert email_templates.subject("verify_email.html") == "Verify your email"
+    assert "reader@mail.com" in email_templates.render("welcome.html", {"email": "reader@mail.com"})
+
+
+class BusyOnceHandler(SinkHandler):
+    """Defers busy recipients only the first time they are seen"""
+
+    def __init__(self):
+        super().__init__()
+        self.deferred = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("busy") and address not in self.deferred:
+            self.deferred.append(address)
+            return "451 try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+
+def test_deferred_recipients_are_redelivered_by_a_retry():
+    handler = BusyOnceHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    client = SMTPClient("127.0.0.1", controller.port, start_tls=False)
+    recipients = ["reader@mail.com", "busy@mail.com"]
+
+    try:
+        with patch.object(celery_tasks, "smtp_client", client):
+            result = celery_tasks.send_bulk_email.apply(args=[recipients, "Hi", "<p>Hi</p>"])
+    finally:
+        worker_loop.run(client.close())
+        controller.stop()
+
+    assert handler.deferred == ["busy@mail.com"]
+    assert handler.delivered == recipients
+    # the retry's own report, sent only to the deferred recipient
+    assert result.get()["sent"] == 1
+
+
+class RecordingClient:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message["To"])
+
+
+def test_deliver_bulk_paces_each_domain():
+    client = RecordingClient()
+    recipients = ["a@mail.com", "b@MAIL.com", "c@other.com", "d@mail.com"]
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    with patch("src.mail.asyncio.sleep", sleep):
+        report = asyncio.run(
+            deliver_bulk(client, recipients, "Hi", "<p>Hi</p>", batch_size=10, rate_per_second=0, rate_per_domain=1)
+        )
+
+    assert report.sent == client.sent == recipients
+    # the sleep is faked so the clock stands still: b waits one interval,
+    # d two, other.com is not held back by mail.com
+    assert sleeps == [pytest.approx(1, abs=0.1), pytest.approx(2, abs=0.1)]
@@ -0,0 +1,117 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import app
+from src.books import routes as book_routes
+from src.db.main import get_session
+from src.reviews import routes as review_routes
+
+book_uid = uuid.uuid4()
+updated_at = datetime(2024, 5, 1, 12, 0)
+
+
+def allow():
+    return True
+
+
+def no_session():
+    return Mock()
+
+
+@pytest.fixture
+def authorized():
+    # plain functions, FastAPI would read a Mock's *args/**kwargs as query parameters
+    overrides = {
+        get_session: no_session,
+        book_routes.access_token_bearer: allow,
+        book_routes.role_checker.dependency: allow,
+        review_routes.user_role_checker.dependency: allow,
+    }
+    saved = dict(app.dependency_overrides)
+    app.dependency_overrides.update(overrides)
+    yield
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(saved)
+
+
+@pytest.fixture
+def client():
+    return TestClient(app, base_url="http://localhost")
+
+
+@pytest.fixture
+def books():
+    service = Mock()
+    service.get_book_version = AsyncMock(return_value=SimpleNamespace(uid=book_uid, updated_at=updated_at))
+    service.get_book_detail_json = AsyncMock(return_value=f'{{"uid": "{book_uid}"}}'.encode())
+    with patch.object(book_routes, "book_service", service):
+        yield service
+
+
+def review(update_at=updated_at):
+    return SimpleNamespace(
+        uid=uuid.uuid4(), rating=4, review_text="good", user_uid=None, book_uid=book_uid,
+        created_at=updated_at, update_at=update_at,
+    )
+
+
+def test_book_matching_etag_is_not_modified(authorized, books, client):
+    first = client.get(f"/api/v1/books/{book_uid}")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    for if_none_match in [etag, f"W/{etag}", f'"other", {etag}', "*"]:
+        response = client.get(f"/api/v1/books/{book_uid}", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+    # the representation is only built for a 200
+    assert books.get_book_detail_json.await_count == 1
+
+
+def test_book_update_changes_etag(authorized, books, client):
+    etag = client.get(f"/api/v1/books/{book_uid}").headers["ETag"]
+
+    books.get_book_version.return_value = SimpleNamespace(uid=book_uid, updated_at=updated_at + timedelta(seconds=1))
+    response = client.get(f"/api/v1/books/{book_uid}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json() == {"uid": str(book_uid)}
+
+
+def test_missing_book_is_not_found(authorized, books, client):
+    books.get_book_version.return_value = None
+
+    response = client.get(f"/api/v1/books/{book_uid}", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 404
+    books.get_book_detail_json.assert_not_awaited()
+
+
+def test_review_conditional_get(authorized, client):
+    current = review()
+    service = Mock(get_review=AsyncMock(return_value=current))
+    with patch.object(review_routes, "review_service", service):
+        url = f"/api/v1/reviews/{current.uid}"
+        first = client.get(url)
+        etag = first.headers["ETag"]
+        assert first.status_code == 200
+
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        assert client.get(url, headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+        current.update_at += timedelta(seconds=1)
+        updated = client.get(url, headers={"If-None-Match": etag})
+        assert updated.status_code == 200
+        assert updated.headers["ETag"] != etag
+        assert updated.json()["uid"] == str(current.uid)
+
+        service.get_review.return_value = None
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 404
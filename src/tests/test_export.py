@@ -0,0 +1,44 @@
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from src.db.export import csv_encoder, encode_ndjson, naive_datetime
+
+
+ROW = {
+    "uid": uuid.UUID("5b1f7c1e-0000-4000-8000-000000000001"),
+    "title": 'Say "hi", again',
+    "published_date": date(2001, 2, 3),
+    "created_at": datetime(2024, 5, 6, 7, 8, 9),
+    "cursor": "abc",
+}
+
+
+def test_ndjson_rows_are_json_lines():
+    body = encode_ndjson([ROW, ROW])
+
+    lines = body.decode().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0]) == {
+        "uid": str(ROW["uid"]),
+        "title": 'Say "hi", again',
+        "published_date": "2001-02-03",
+        "created_at": "2024-05-06T07:08:09",
+        "cursor": "abc",
+    }
+
+
+def test_csv_rows_quote_values_and_use_iso_dates():
+    body = csv_encoder(["title", "created_at", "cursor"])([ROW])
+
+    assert body == b'"Say ""hi"", again",2024-05-06T07:08:09,abc\r\n'
+
+
+def test_aware_filter_bounds_become_naive_local_time():
+    aware = datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=2)))
+
+    naive = naive_datetime(aware)
+
+    assert naive.tzinfo is None
+    assert naive == aware.astimezone().replace(tzinfo=None)
+    assert naive_datetime(None) is None
@@ -0,0 +1,41 @@
+import json
+import logging
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from src import app
+from src.log import JSONFormatter
+
+
+def requests_total(route: str, status: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "bookly_http_requests_total", {"method": "GET", "route": route, "status": status}
+    )
+    return value or 0
+
+
+def test_requests_are_counted_by_route_template():
+    client = TestClient(app, base_url="http://localhost")
+    before = requests_total("/api/v1/books/{book_uid}", "403")
+    unmatched_before = requests_total("unmatched", "404")
+
+    client.get("/api/v1/books/one")
+    client.get("/api/v1/books/two")
+    client.get("/no/such/path")
+
+    assert requests_total("/api/v1/books/{book_uid}", "403") == before + 2
+    assert requests_total("unmatched", "404") == unmatched_before + 1
+    assert b"bookly_http_request_duration_seconds_bucket" in client.get("/metrics").content
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.makeLogRecord(
+        {"name": "bookly.access", "msg": "GET %s", "args": ("/",), "levelno": logging.INFO, "levelname": "INFO", "status": 200}
+    )
+
+    entry = json.loads(JSONFormatter().format(record))
+
+    assert entry["message"] == "GET /"
+    assert entry["status"] == 200
+    assert entry["logger"] == "bookly.access"
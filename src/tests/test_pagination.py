@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+from src.db.models import Book
+from src.db.pagination import build_page, decode_cursor, encode_cursor, paginate
+from src.errors import InvalidCursor
+
+
+def test_cursor_round_trip():
+    values = [datetime(2025, 2, 9, 17, 26, 29, 123456), uuid.uuid4()]
+    cursor = encode_cursor(values)
+    assert decode_cursor(cursor, 2) == values
+
+
+def test_invalid_cursor_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", 2)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor([1]), 2)
+
+
+def test_paginate_uses_row_comparison():
+    cursor = encode_cursor([datetime(2025, 1, 1), uuid.uuid4()])
+    statement = paginate(select(Book), (Book.created_at, Book.uid), cursor, 10)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "(books.created_at, books.uid) < (" in sql
+    assert "ORDER BY books.created_at DESC, books.uid DESC" in sql
+
+
+def test_build_page_sets_next_cursor_only_when_more_rows():
+    rows = [(i, i) for i in range(3)]
+    assert build_page(rows, 3, lambda r: r)["next_cursor"] is None
+    page = build_page(rows, 2, lambda r: r)
+    assert page["items"] == rows[:2]
+    assert decode_cursor(page["next_cursor"], 2) == [1, 1]
@@ -0,0 +1,23 @@
+import asyncio
+
+from src.auth import utils
+
+
+def test_hash_and_check_password_off_loop():
+    async def run():
+        password_hash = await utils.hash_password("testpass")
+        return await utils.check_password("testpass", password_hash), await utils.check_password("wrong", password_hash)
+
+    (valid, new_hash), (invalid, _) = asyncio.run(run())
+    assert valid and new_hash is None
+    assert not invalid
+
+
+def test_outdated_cost_is_rehashed_on_check():
+    old_hash = utils.password_context.hash("testpass", rounds=4)
+
+    valid, new_hash = asyncio.run(utils.check_password("testpass", old_hash))
+
+    assert valid
+    assert new_hash is not None and new_hash != old_hash
+    assert not utils.password_context.needs_update(new_hash)
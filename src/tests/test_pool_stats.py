@@ -0,0 +1,44 @@
+import threading
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from src.db.pool_stats import TimedCheckout, instrument_pool
+
+
+class TimedQueuePool(TimedCheckout, QueuePool):
+    pass
+
+
+def sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+def test_checkouts_record_wait_and_pool_usage(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1, max_overflow=1, pool_timeout=5
+    )
+    instrument_pool(engine)
+    checkouts = sample("bookly_db_pool_wait_seconds_count")
+    waited = sample("bookly_db_pool_wait_seconds_sum")
+    opened = sample("bookly_db_pool_connections_opened_total")
+    checked_out = sample("bookly_db_pool_checked_out")
+
+    first = engine.connect()
+    second = engine.connect()
+    assert sample("bookly_db_pool_checked_out") == checked_out + 2
+    assert sample("bookly_db_pool_overflow") == 1
+
+    # a third checkout waits for one of the two to come back
+    threading.Timer(0.2, second.close).start()
+    with engine.connect() as third:
+        third.execute(text("SELECT 1"))
+    first.close()
+
+    assert sample("bookly_db_pool_wait_seconds_count") == checkouts + 3
+    assert sample("bookly_db_pool_wait_seconds_sum") - waited >= 0.15
+    assert sample("bookly_db_pool_connections_opened_total") == opened + 2
+    assert sample("bookly_db_pool_checked_out") == checked_out
+    assert sample("bookly_db_pool_overflow") == 0
+    engine.dispose()
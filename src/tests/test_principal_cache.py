@@ -0,0 +1,102 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from src.auth import service
+from src.auth.dependencies import handle_auth_invalidation
+from src.auth.service import UserService, principal_cache
+
+email = "reader@mail.com"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+def session_returning(*rows):
+    session = Mock()
+    results = [Mock(first=Mock(return_value=row)) for row in rows]
+    session.exec = AsyncMock(side_effect=results)
+    return session
+
+
+def user_row(role="user", is_verified=True):
+    return SimpleNamespace(_mapping={"uid": uuid.uuid4(), "email": email, "role": role, "is_verified": is_verified})
+
+
+def get_principal(session):
+    return asyncio.run(UserService().get_principal_by_email(email, session))
+
+
+def test_miss_loads_auth_columns_then_hits():
+    session = session_returning(user_row(role="admin"))
+
+    first = get_principal(session)
+    second = get_principal(session)
+
+    assert first.role == "admin" and first.is_verified
+    assert second is first
+    assert session.exec.await_count == 1
+    statement = str(session.exec.await_args.kwargs["statement"])
+    assert "password_hash" not in statement
+
+
+def test_unknown_user_is_not_cached():
+    session = session_returning(None, None)
+
+    assert get_principal(session) is None
+    assert get_principal(session) is None
+    assert session.exec.await_count == 2
+
+
+@pytest.mark.parametrize("change", [
+    {"role": "user"},
+    {"is_verified": False},
+    {"password_hash": "new-hash"},
+])
+def test_update_of_principal_fields_invalidates(change):
+    stale = get_principal(session_returning(user_row(role="admin")))
+    user = SimpleNamespace(email=email, role="admin", is_verified=True, password_hash="hash")
+
+    with patch.object(service, "publish_auth_invalidation", AsyncMock()) as publish:
+        asyncio.run(UserService().update_user(user, change, AsyncMock()))
+
+    publish.assert_awaited_once_with("user", email)
+    fresh = get_principal(session_returning(user_row(role="user", is_verified=False)))
+    assert fresh is not stale and fresh.role == "user" and not fresh.is_verified
+
+
+def test_update_of_other_fields_keeps_principal():
+    cached = get_principal(session_returning(user_row()))
+    user = SimpleNamespace(email=email, first_name="Old")
+
+    with patch.object(service, "publish_auth_invalidation", AsyncMock()) as publish:
+        asyncio.run(UserService().update_user(user, {"first_name": "New"}, AsyncMock()))
+
+    publish.assert_not_awaited()
+    assert principal_cache.get(email) is cached
+
+
+def test_invalidation_is_local_when_publishing_fails():
+    get_principal(session_returning(user_row(role="admin")))
+    user = SimpleNamespace(email=email, role="admin")
+
+    with patch.object(service, "publish_auth_invalidation", AsyncMock(side_effect=ConnectionError("down"))):
+        asyncio.run(UserService().update_user(user, {"role": "user"}, AsyncMock()))
+
+    assert principal_cache.get(email) is None
+
+
+def test_invalidation_from_another_worker_evicts():
+    get_principal(session_returning(user_row(role="admin")))
+
+    handle_auth_invalidation("user", email)
+
+    assert principal_cache.get(email) is None
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.db.query_stats import instrument_engine, track_queries
+from src.errors import QueryBudgetExceeded
+
+engine = create_engine("sqlite://")
+instrument_engine(engine)
+
+
+def test_statements_and_rows_are_counted_per_context():
+    with engine.connect() as conn:
+        with track_queries() as stats:
+            conn.execute(text("SELECT 1 UNION ALL SELECT 2")).all()
+            conn.execute(text("SELECT 3")).all()
+        conn.execute(text("SELECT 4"))
+
+    assert stats.statements == 2
+    assert stats.duration > 0
+    assert 'desc="2 queries' in stats.server_timing()
+
+
+def test_fail_mode_raises_on_the_statement_over_budget():
+    with engine.connect() as conn:
+        with pytest.raises(QueryBudgetExceeded):
+            with track_queries(budget=2, mode="fail") as stats:
+                for i in range(5):
+                    conn.execute(text(f"SELECT {i}"))
+
+    assert stats.statements == 3
+    assert stats.over_budget == ["SELECT 2"]
+
+
+def test_failed_statements_leave_no_timing_behind():
+    with engine.connect() as conn:
+        with track_queries() as stats:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT 1"))
+
+        assert "query_start" not in conn.info
+
+    assert stats.statements == 1
+    assert 0 < stats.duration < 1
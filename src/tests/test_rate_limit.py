@@ -0,0 +1,55 @@
+"""
+The Redis script runs against TEST_REDIS_URL when it is set, e.g.
+TEST_REDIS_URL=redis://localhost:6379/15 (keys under bookly:ratelimit:test: are removed).
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+from redis import asyncio as aioredis
+
+from src.rate_limit import RATE_LIMIT_PREFIX, RateLimit, SlidingWindowLimiter
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+def test_fallback_when_redis_is_down():
+    async def run():
+        # nothing listens on port 1
+        redis = aioredis.from_url("redis://127.0.0.1:1/0", socket_connect_timeout=0.5)
+        limiter = SlidingWindowLimiter(redis, fallback_size=100)
+        limits = [("test:ip:a", RateLimit(2, 60))]
+        results = [await limiter.hit(limits) for _ in range(3)]
+        other = await limiter.hit([("test:ip:b", RateLimit(2, 60))])
+        await redis.aclose()
+        return results, other
+
+    results, other = asyncio.run(run())
+    assert results[:2] == [0, 0]
+    assert 59 < results[2] <= 60
+    assert other == 0
+
+
+@pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL is not set")
+def test_sliding_window_is_exact_under_concurrency():
+    async def run():
+        redis = aioredis.from_url(TEST_REDIS_URL)
+        limiter = SlidingWindowLimiter(redis, fallback_size=100)
+        prefix = f"test:{uuid.uuid4().hex}"
+        user, ip = (f"{prefix}:user", RateLimit(5, 60)), (f"{prefix}:ip", RateLimit(8, 60))
+        try:
+            results = await asyncio.gather(*[limiter.hit([user, ip]) for _ in range(20)])
+            # a request rejected by the user limit must not count against the ip
+            other_user = await limiter.hit([(f"{prefix}:other", RateLimit(5, 60)), ip])
+            return results, other_user
+        finally:
+            keys = [key async for key in redis.scan_iter(f"{RATE_LIMIT_PREFIX}{prefix}:*")]
+            if keys:
+                await redis.delete(*keys)
+            await redis.aclose()
+
+    results, other_user = asyncio.run(run())
+    assert results.count(0) == 5
+    assert all(0 < retry_after <= 60 for retry_after in results if retry_after)
+    assert other_user == 0
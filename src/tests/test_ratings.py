@@ -0,0 +1,47 @@
+import uuid
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+from sqlmodel import update
+
+from src.books.query import BookFilters, book_list_statement
+from src.books.ratings import rating_change, reconcile_statement
+from src.db.models import Book
+from src.db.pagination import encode_cursor
+from src.reviews.schemas import ReviewCreateModel
+
+
+def compile_sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.parametrize("rating", [0, 6])
+def test_rating_out_of_range_rejected(rating):
+    with pytest.raises(ValidationError):
+        ReviewCreateModel(rating=rating, review_text="meh")
+
+
+def test_rating_change_is_relative():
+    sql = compile_sql(update(Book).values(**rating_change(4, -1)))
+    assert "review_count=(books.review_count + " in sql
+    assert "rating_4=(books.rating_4 + " in sql
+    assert "rating_5" not in sql
+    assert rating_change(0, 1) == {}
+
+
+def test_reconcile_only_updates_books_that_drifted():
+    sql = compile_sql(reconcile_statement([uuid.uuid4()]))
+    assert "IS DISTINCT FROM" in sql
+    assert "LEFT OUTER JOIN reviews" in sql
+    # stamped with the app clock, not the database one
+    assert "updated_at=%(updated_at)s" in sql
+
+
+def test_sort_by_rating_aggregates():
+    cursor = encode_cursor([4.5, uuid.uuid4()])
+    sql = compile_sql(book_list_statement(BookFilters(), "top_rated", cursor, 20))
+    assert "(books.average_rating, books.uid) < (" in sql
+    assert "ORDER BY books.average_rating DESC, books.uid DESC" in sql
+    sql = compile_sql(book_list_statement(BookFilters(), "most_reviewed", None, 20))
+    assert "ORDER BY books.review_count DESC, books.uid DESC" in sql
@@ -0,0 +1,48 @@
+import asyncio
+
+from src.db.redis import KeyBatcher, parse_invalidation
+
+
+class RecordingClient:
+    def __init__(self, data, fail=False):
+        self.data = data
+        self.fail = fail
+        self.calls = []
+
+    async def mget(self, keys):
+        self.calls.append(list(keys))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise ConnectionError("redis is down")
+        return [self.data.get(key) for key in keys]
+
+
+def test_concurrent_gets_share_one_mget():
+    client = RecordingClient({"a": b"1", "c": b""})
+    batcher = KeyBatcher(client, max_batch_size=2)
+
+    async def run():
+        first = await asyncio.gather(*[batcher.get(key) for key in ["a", "b", "a", "c"]])
+        second = await batcher.get("b")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == [b"1", None, b"1", b""]
+    assert second is None
+    # three distinct keys in batches of two, then the later lookup on its own
+    assert client.calls == [["a", "b"], ["c"], ["b"]]
+
+
+def test_errors_reach_every_caller():
+    batcher = KeyBatcher(RecordingClient({}, fail=True))
+
+    async def run():
+        return await asyncio.gather(batcher.get("a"), batcher.get("b"), return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in asyncio.run(run()))
+
+
+def test_malformed_invalidations_are_skipped():
+    assert parse_invalidation(b'{"kind": "jti", "key": "abc"}') == ("jti", "abc")
+    for data in [b"not json", b'{"kind": "jti"}', b"[1, 2]", b"5"]:
+        assert parse_invalidation(data) is None
@@ -0,0 +1,185 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from src.db.cache import ResponseCache
+
+
+class FakeLock:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    async def acquire(self, blocking=True):
+        if self.client.fail:
+            raise ConnectionError("redis is down")
+        if self.name in self.client.locks:
+            return False
+        self.client.locks.add(self.name)
+        return True
+
+    async def release(self):
+        self.client.locks.discard(self.name)
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.data = {}
+        self.locks = set()
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis is down")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis is down")
+        self.data[key] = value
+
+    async def incr(self, key):
+        if self.fail:
+            raise ConnectionError("redis is down")
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def lock(self, name, timeout=None):
+        return FakeLock(self, name)
+
+
+def counting_loader(value, started=None, release=None):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0)
+        if started is not None:
+            started.set()
+        if release is not None:
+            await release.wait()
+        return value
+
+    return loader, calls
+
+
+def run_with(client, coroutine):
+    with patch("src.db.cache.redis_client", client):
+        return asyncio.run(coroutine())
+
+
+def test_concurrent_misses_load_once():
+    client = FakeRedis()
+    cache = ResponseCache(ttl=60, lock_ttl=5, lock_wait=1)
+    loader, calls = counting_loader(b"[]")
+
+    async def run():
+        first = await asyncio.gather(*[cache.get_or_load("tags", loader) for _ in range(5)])
+        return first, await cache.get_or_load("tags", loader)
+
+    values, cached = run_with(client, run)
+    assert values == [b"[]"] * 5 and cached == b"[]"
+    assert len(calls) == 1
+    assert client.data == {"tags": b"[]"}
+    assert cache.stats() == {"hits": 1, "misses": 1, "coalesced": 4, "errors": 0}
+
+
+def test_redis_errors_fall_back_to_loader():
+    cache = ResponseCache(ttl=60, lock_ttl=5, lock_wait=1)
+    loader, calls = counting_loader(b"[]")
+
+    async def run():
+        return [await cache.get_or_load("tags", loader) for _ in range(2)]
+
+    assert run_with(FakeRedis(fail=True), run) == [b"[]", b"[]"]
+    assert len(calls) == 2
+    assert cache.errors == 4
+
+
+def test_loader_errors_reach_waiters():
+    cache = ResponseCache(ttl=60, lock_ttl=5, lock_wait=1)
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("database is down")
+
+    async def run():
+        return await asyncio.gather(
+            *[cache.get_or_load("tags", failing) for _ in range(3)], return_exceptions=True
+        )
+
+    assert all(isinstance(result, ValueError) for result in run_with(FakeRedis(), run))
+
+
+def test_cancelled_leader_hands_load_to_a_waiter():
+    client = FakeRedis()
+    cache = ResponseCache(ttl=60, lock_ttl=5, lock_wait=1)
+
+    async def run():
+        started = asyncio.Event()
+        leader_loader, leader_calls = counting_loader(b"leader", started, asyncio.Event())
+        waiter_loader, waiter_calls = counting_loader(b"waiter")
+
+        leader = asyncio.create_task(cache.get_or_load("tags", leader_loader))
+        await started.wait()
+        waiters = [asyncio.create_task(cache.get_or_load("tags", waiter_loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters), leader_calls, waiter_calls
+
+    values, leader_calls, waiter_calls = run_with(client, run)
+    assert values == [b"waiter"] * 3
+    assert len(leader_calls) == 1
+    # the first waiter to resume loads, the others wait for it
+    assert len(waiter_calls) == 1
+    assert client.data == {"tags": b"waiter"}
+    assert not client.locks
+
+
+def test_load_racing_a_write_does_not_outlive_it():
+    client = FakeRedis()
+    cache = ResponseCache(ttl=60, lock_ttl=5, lock_wait=1)
+    rows = [b"old"]
+
+    async def run():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_loader():
+            value = rows[0]
+            started.set()
+            await release.wait()
+            return value
+
+        async def loader():
+            return rows[0]
+
+        # the load reads the rows, then a write commits and invalidates
+        # before the load stores what it read
+        stale = asyncio.create_task(cache.get_or_load_current("tags", slow_loader))
+        await started.wait()
+        rows[0] = b"new"
+        await cache.new_generation("tags")
+        release.set()
+        return await stale, await cache.get_or_load_current("tags", loader)
+
+    assert run_with(client, run) == (b"old", b"new")
+    assert client.data["tags:1"] == b"new"
+
+
+def test_generation_unreadable_skips_the_cache():
+    cache = ResponseCache(ttl=60, lock_ttl=5, lock_wait=1)
+    loader, calls = counting_loader(b"[]")
+
+    async def run():
+        value = await cache.get_or_load_current("tags", loader)
+        await cache.new_generation("tags")
+        return value
+
+    assert run_with(FakeRedis(fail=True), run) == b"[]"
+    assert len(calls) == 1
+    assert cache.errors == 2
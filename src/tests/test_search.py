@@ -0,0 +1,42 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.books.search import START_SEL, STOP_SEL, highlight, search_statement
+from src.db.pagination import encode_cursor
+from src.errors import InvalidCursor
+
+
+def test_highlight_escapes_text_around_matches():
+    headline = f"<b>{START_SEL}Dune{STOP_SEL}</b> & more"
+
+    assert highlight(headline) == "&lt;b&gt;<mark>Dune</mark>&lt;/b&gt; &amp; more"
+
+
+def test_fuzzy_search_adds_trigram_matching():
+    def sql(fuzzy):
+        return str(search_statement("dune", fuzzy, None, 20).compile(dialect=postgresql.dialect()))
+
+    assert "<%" in sql(True) and "word_similarity" in sql(True)
+    assert "<%" not in sql(False)
+    assert "search_vector @@ websearch_to_tsquery" in sql(False)
+
+
+@pytest.mark.parametrize("values", [
+    [datetime(2024, 5, 1), uuid.uuid4()],
+    [3, uuid.uuid4()],
+    [0.5, "not a uuid"],
+])
+def test_cursor_of_another_listing_is_rejected(values):
+    with pytest.raises(InvalidCursor):
+        search_statement("dune", False, encode_cursor(values), 20)
+
+
+def test_rank_cursor_continues_after_last_hit():
+    sql = str(search_statement("dune", False, encode_cursor([0.5, uuid.uuid4()]), 20).compile(
+        dialect=postgresql.dialect()
+    ))
+
+    assert "(CAST(ts_rank_cd(" in sql and ") < (" in sql
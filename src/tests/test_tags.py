@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi.exceptions import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from src.db.models import Tag
+from src.tags.schemas import TagCreateModel
+from src.tags.service import TagService
+
+
+def test_rename_to_existing_name_is_forbidden():
+    session = AsyncMock()
+    session.flush.side_effect = IntegrityError("UPDATE tags", {}, Exception("uq_tags_name"))
+    service = TagService()
+    tag = Tag(uid=uuid.uuid4(), name="fiction")
+
+    with patch.object(service, "get_tag_by_uid", AsyncMock(return_value=tag)), \
+            patch.object(service, "_touch_tagged_books", AsyncMock()) as touch:
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(service.update_tag(tag.uid, TagCreateModel(name="fantasy"), session))
+
+    assert raised.value.status_code == 403
+    assert raised.value.detail == "Tag exists"
+    session.rollback.assert_awaited_once()
+    session.commit.assert_not_awaited()
+    touch.assert_not_awaited()
+
+
+class RecordingSession:
+    """Answers each exec with the next canned rows and keeps the statements"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    async def exec(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        result = Mock()
+        result.all.return_value = self.results.pop(0)
+        return result
+
+
+def resolve(names, session):
+    return asyncio.run(TagService().resolve_tags(names, session))
+
+
+def test_resolve_existing_tags_is_one_select():
+    fiction, fantasy = uuid.uuid4(), uuid.uuid4()
+    session = RecordingSession([(fantasy, "fantasy"), (fiction, "fiction")])
+
+    assert resolve(["fiction", "fantasy", "fiction"], session) == ([fiction, fantasy], [])
+    assert len(session.statements) == 1
+    assert "tags.name IN" in session.statements[0]
+
+
+def test_resolve_inserts_only_missing_tags():
+    fiction, poetry = uuid.uuid4(), uuid.uuid4()
+    session = RecordingSession([(fiction, "fiction")], [(poetry, "poetry")])
+
+    assert resolve(["poetry", "fiction"], session) == ([poetry, fiction], ["poetry"])
+    assert len(session.statements) == 2
+    insert = session.statements[1]
+    assert insert.startswith("INSERT INTO tags")
+    assert "ON CONFLICT (name) DO NOTHING RETURNING tags.uid, tags.name" in insert
+
+
+def test_resolve_reselects_tags_created_concurrently():
+    drama, poetry = uuid.uuid4(), uuid.uuid4()
+    # poetry is inserted by another request between the lookup and the insert
+    session = RecordingSession([], [(drama, "drama")], [(poetry, "poetry")])
+
+    assert resolve(["poetry", "drama"], session) == ([poetry, drama], ["drama"])
+    assert len(session.statements) == 3
+    assert session.statements[2].startswith("SELECT tags.uid, tags.name")
+    assert "tags.name IN" in session.statements[2]
+
+
+def test_resolve_nothing_runs_no_query():
+    session = RecordingSession()
+
+    assert resolve([], session) == ([], [])
+    assert session.statements == []
+
+
+def test_delete_tag_removes_links_without_loading_books():
+    service = TagService()
+    tag = Tag(uid=uuid.uuid4(), name="fiction")
+    session = RecordingSession([], [])
+    session.commit = AsyncMock()
+
+    with patch.object(service, "get_tag_by_uid", AsyncMock(return_value=tag)) as get_tag, \
+            patch.object(service, "_touch_tagged_books", AsyncMock()), \
+            patch("src.tags.service.response_cache.new_generation", AsyncMock()):
+        asyncio.run(service.delete_tag(tag.uid, session))
+
+    assert "options" not in get_tag.await_args.kwargs
+    assert session.statements == [
+        "DELETE FROM booktag WHERE booktag.tag_id = %(tag_id_1)s::UUID",
+        "DELETE FROM tags WHERE tags.uid = %(uid_1)s::UUID",
+    ]
+    session.commit.assert_awaited_once()
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from src.auth import dependencies
+from src.auth.cache import TokenCache, TTLCache
+from src.errors import InvalidToken
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_entries_expire():
+    cache = TTLCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_token_cache_does_not_outlive_token():
+    cache = TokenCache(maxsize=10, ttl=60)
+    cache.add("expired", {"jti": "1", "exp": time.time() - 1}, cache.generation)
+    cache.add("valid", {"jti": "2", "exp": time.time() + 30}, cache.generation)
+
+    assert cache.get("expired") is None
+    assert cache.get("valid")["jti"] == "2"
+
+
+def test_token_cache_invalidate_by_jti():
+    cache = TokenCache(maxsize=10, ttl=60)
+    cache.add("token", {"jti": "abc", "exp": time.time() + 30}, cache.generation)
+
+    cache.invalidate_jti("abc")
+
+    assert cache.get("token") is None
+    assert cache._tokens_by_jti == {}
+
+
+@pytest.mark.parametrize("invalidate", [
+    lambda cache: cache.invalidate_jti("abc"),
+    lambda cache: cache.invalidate_jti("other"),
+    lambda cache: cache.clear(),
+])
+def test_token_cache_skips_tokens_checked_before_an_invalidation(invalidate):
+    cache = TokenCache(maxsize=10, ttl=60)
+    generation = cache.generation
+
+    invalidate(cache)
+    cache.add("token", {"jti": "abc", "exp": time.time() + 30}, generation)
+
+    assert cache.get("token") is None
+    assert cache._tokens_by_jti == {}
+
+
+def test_token_revoked_during_blocklist_check_is_not_cached():
+    token_data = {"jti": "abc", "exp": time.time() + 30, "refresh": False}
+    revoked = set()
+
+    async def token_in_blocklist(jti):
+        # the revocation is published while this lookup is in flight
+        revoked.add(jti)
+        dependencies.handle_auth_invalidation("jti", jti)
+        return False
+
+    async def authenticate():
+        request = SimpleNamespace(headers={"Authorization": "Bearer token"})
+        return await dependencies.AccessTokenBearer()(request)
+
+    with patch.object(dependencies, "token_cache", TokenCache(maxsize=10, ttl=60)) as cache, \
+            patch.object(dependencies, "decode_token", lambda token: dict(token_data)), \
+            patch.object(dependencies, "token_in_blocklist", token_in_blocklist):
+        assert asyncio.run(authenticate())["jti"] == "abc"
+        assert cache.get("token") is None
+
+        # the next request checks the blocklist again and sees the revocation
+        with patch.object(dependencies, "token_in_blocklist", lambda jti: asyncio.sleep(0, jti in revoked)):
+            with pytest.raises(InvalidToken):
+                asyncio.run(authenticate())
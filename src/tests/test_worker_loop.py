@@ -0,0 +1,28 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.worker_loop import WorkerLoop
+
+
+def test_tasks_share_one_loop_and_run_concurrently():
+    worker_loop = WorkerLoop()
+    loops = set()
+    closed = []
+
+    @worker_loop.on_shutdown
+    async def close_clients():
+        closed.append(asyncio.get_running_loop())
+
+    async def task():
+        loops.add(asyncio.get_running_loop())
+        await asyncio.sleep(0.2)
+        return 1
+
+    with ThreadPoolExecutor(10) as pool:
+        results = list(pool.map(lambda _: worker_loop.run(task()), range(10)))
+    worker_loop.stop()
+
+    assert sum(results) == 10
+    assert len(loops) == 1
+    assert closed == list(loops)
+    assert next(iter(loops)).is_closed()
@@ -0,0 +1,86 @@
+"""
+A long-lived asyncio loop for Celery worker processes.
+
+The loop runs on a daemon thread started once per process, after the
+prefork pool has forked. Tasks submit coroutines to it and block their own
+thread until the result is ready, so with `--pool=threads` one process
+handles as many I/O-bound tasks at a time as it has threads, all sharing the
+SMTP connection, the Redis client and the database engine.
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger("bookly.worker_loop")
+
+ShutdownHook = Callable[[], Awaitable[None]]
+
+SHUTDOWN_TIMEOUT = 10
+
+
+class WorkerLoop:
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._shutdown_hooks: List[ShutdownHook] = []
+
+    def on_shutdown(self, hook: ShutdownHook) -> ShutdownHook:
+        """Register a coroutine function run on the loop before it stops"""
+        self._shutdown_hooks.append(hook)
+        return hook
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # a loop inherited through fork has no thread driving it
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="worker-loop", daemon=True
+                )
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._loop
+
+    def run(self, coro):
+        """Run coro on the worker loop and wait for its result"""
+        loop = self.start()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+
+        for hook in self._shutdown_hooks:
+            try:
+                asyncio.run_coroutine_threadsafe(hook(), loop).result(SHUTDOWN_TIMEOUT)
+            except Exception:
+                logger.exception("worker loop shutdown hook %r failed", hook)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(SHUTDOWN_TIMEOUT)
+        loop.close()
+
+
+worker_loop = WorkerLoop()
+
+
+def async_task(app, **options):
+    """
+    Register a coroutine function as a Celery task run on the worker loop.
+    Accepts the same options as `app.task`.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            return worker_loop.run(fn(*args, **kwargs))
+
+        return app.task(**options)(run)
+
+    return decorator